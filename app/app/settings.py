@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -91,6 +92,64 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        # With RECIPE_RESPONSE_CACHE['MAX_ENTRY_SIZE'] this caps the cache at 64 MiB per process.
+        'OPTIONS': {'MAX_ENTRIES': 1000, 'CULL_FREQUENCY': 4},
+    },
+}
+
+RECIPE_RESPONSE_CACHE = {
+    'CACHE_ALIAS': 'responses',
+    'TIMEOUT': 300,
+    'MAX_ENTRY_SIZE': 64 * 1024,
+}
+
+TOKEN_AUTH_CACHE = {
+    'CACHE_ALIAS': None,
+    'TIMEOUT': 300,
+    'LOCAL_TIMEOUT': 30,
+    'MAX_ENTRIES': 10000,
+}
+
+PASSWORD_HASHING = {
+    'MAX_CONCURRENT': 4,
+    'RETRY_AFTER': 1,
+    # Owned by the app user in the image, like MEDIA_ROOT.
+    'LOCK_DIR': '/vol/web/password-hashing/',
+}
+
+SIGNED_TOKENS = {
+    'ACCESS_TTL': 300,
+    'REFRESH_TTL': 14 * 24 * 3600,
+    'REVOCATION_REFRESH': 10,
+    'REVOCATION_OVERLAP': 60,
+    'BACKGROUND_REFRESH': True,
+}
+
+RECIPE_SUGGEST = {
+    'CACHE': True,
+    'MAX_USERS': 1000,
+    'MAX_NAMES': 20000,
+    'LIMIT': 10,
+    'MAX_LIMIT': 50,
+}
+
+RESPONSE_COMPRESSION = {
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -141,6 +200,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
-REST_FRAMEWORK = {'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'}
+REST_FRAMEWORK = {
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Largest accepted request body apart from file uploads, also enforced by the API's JSON parsers.
+# Raised from Django's 2.5 MB default so bulk recipe imports fit.
+DATA_UPLOAD_MAX_MEMORY_SIZE = 16 * 1024 * 1024
 
 SPECTACULAR_SETTINGS = {'COMPONENT_SPLIT_REQUEST': True}
\ No newline at end of file
@@ -0,0 +1,219 @@
+"""
+Token authentication without a database round trip per request
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.tokens import InvalidToken, verify_access_token
+
+
+DEFAULTS = {
+    'CACHE_ALIAS': None,
+    'TIMEOUT': 300,
+    'LOCAL_TIMEOUT': 30,
+    'MAX_ENTRIES': 10000,
+}
+
+# Never copied into the cache: the password hash has no business in a shared
+# cache and the versions change without saving the user, so these are left
+# deferred and loaded from the database when something reads them.
+UNCACHED_USER_FIELDS = ('password', 'data_version', 'data_modified_at', 'token_version', 'token_changed_at')
+
+
+class TokenCache:
+    """
+    Authenticated tokens and the field values of their users.
+
+    Entries are keyed on a sha256 of the token so the cache never holds usable
+    credentials. Lookups go to a bounded in-process LRU first and then to the
+    optional shared Django cache named by `TOKEN_AUTH_CACHE['CACHE_ALIAS']`.
+    Invalidation reaches the local LRU and the shared cache; other processes
+    drop their local copy after `LOCAL_TIMEOUT` seconds at the latest.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+        self.reset_stats()
+
+    @property
+    def options(self):
+        return {**DEFAULTS, **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+
+    @property
+    def shared(self):
+        alias = self.options['CACHE_ALIAS']
+        return caches[alias] if alias else None
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+    def make_key(self, token_key):
+        return f'auth-token:{hashlib.sha256(token_key.encode("utf-8")).hexdigest()}'
+
+    def get(self, token_key):
+        key = self.make_key(token_key)
+
+        with self._lock:
+            expires, entry = self._local.get(key, (0, None))
+            if expires > time.monotonic():
+                self._local.move_to_end(key)
+                self._stats['local_hits'] += 1
+                return entry
+
+        entry = self.shared.get(key) if self.shared is not None else None
+        if entry is None:
+            self._count('misses')
+            return None
+
+        self._count('shared_hits')
+        self._store_local(key, entry)
+        return entry
+
+    def _store_local(self, key, entry):
+        options = self.options
+
+        with self._lock:
+            self._local[key] = (time.monotonic() + options['LOCAL_TIMEOUT'], entry)
+            self._local.move_to_end(key)
+            while len(self._local) > options['MAX_ENTRIES']:
+                self._local.popitem(last=False)
+
+    def set(self, token_key, entry):
+        key = self.make_key(token_key)
+        self._store_local(key, entry)
+
+        if self.shared is not None:
+            self.shared.set(key, entry, self.options['TIMEOUT'])
+
+        self._count('stores')
+
+    def invalidate(self, *token_keys):
+        keys = [self.make_key(token_key) for token_key in token_keys]
+
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+
+        if self.shared is not None:
+            self.shared.delete_many(keys)
+
+        self._count('invalidations')
+
+
+token_cache = TokenCache()
+
+
+def _cached_fields(model, exclude=()):
+    return tuple(field.attname for field in model._meta.concrete_fields if field.attname not in exclude)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    `TokenAuthentication` answering repeated tokens from `token_cache`.
+
+    The user is rebuilt with `Model.from_db()` from the cached field values,
+    with the fields in `UNCACHED_USER_FIELDS` deferred. The data version
+    therefore stays exact across processes and costs a primary key lookup
+    only on the views that read it.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is not None:
+            return self.from_entry(entry)
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, self.to_entry(user, token))
+
+        return user, token
+
+    def to_entry(self, user, token):
+        user_fields = _cached_fields(type(user), UNCACHED_USER_FIELDS)
+        token_fields = _cached_fields(type(token))
+
+        return (
+            (user_fields, tuple(getattr(user, name) for name in user_fields)),
+            (token_fields, tuple(getattr(token, name) for name in token_fields)),
+        )
+
+    def from_entry(self, entry):
+        (user_fields, user_values), (token_fields, token_values) = entry
+        user_model, token_model = get_user_model(), self.get_model()
+
+        user = user_model.from_db(user_model.objects.db, user_fields, user_values)
+        token = token_model.from_db(token_model.objects.db, token_fields, token_values)
+        token.user = user
+
+        return user, token
+
+
+def invalidate_user_tokens(user_id):
+    """Drop the cached tokens of a user, after their password, activity or profile changed."""
+    keys = list(Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+    if keys:
+        token_cache.invalidate(*keys)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates `Authorization: Bearer <access token>` with the signed tokens of `core.tokens`.
+
+    The signature, expiry and revocation checks need no query. The user is
+    built with only its primary key loaded and loads other fields on access.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            raise AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+
+        try:
+            user_id = verify_access_token(auth[1].decode())
+        except (UnicodeError, InvalidToken):
+            raise AuthenticationFailed(_('Invalid or expired token.'))
+
+        user_model = get_user_model()
+        return user_model.from_db(user_model.objects.db, ('id',), (user_id,)), None
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+class SignedTokenScheme(OpenApiAuthenticationExtension):
+    target_class = SignedTokenAuthentication
+    name = 'signedTokenAuth'
+
+    def get_security_definition(self, auto_schema):
+        return {'type': 'http', 'scheme': 'bearer'}
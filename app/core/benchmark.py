@@ -0,0 +1,138 @@
+"""
+Helpers for benchmark management commands
+"""
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Recipe, Tag, Ingredient
+
+
+BATCH_SIZE = 5000
+
+
+class BenchmarkCommand(BaseCommand):
+    """
+    Base class for benchmarks.
+
+    `benchmark()` runs inside a transaction that is always rolled back, so the
+    seeded rows never outlive the command.
+    """
+    repeat = 5
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=self.repeat, help='Number of timed runs per case')
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+
+        with transaction.atomic():
+            self.benchmark(**options)
+            transaction.set_rollback(True)
+
+    def benchmark(self, **options):
+        raise NotImplementedError('subclasses of BenchmarkCommand must provide a benchmark() method')
+
+    def measure(self, func):
+        """Return the median wall time of `func` in milliseconds and the result of its last run."""
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return statistics.median(timings), result
+
+    def peak_memory(self, func):
+        """Return the peak Python memory allocated while running `func` once, in bytes."""
+        tracemalloc.start()
+        try:
+            func()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def report(self, label, ms, **extra):
+        details = ''.join(f'  {key}={value}' for key, value in extra.items())
+        self.stdout.write(f'{label:<40} {ms:>10.2f} ms{details}')
+
+    def compare(self, label, baseline_ms, ms):
+        self.stdout.write(self.style.SUCCESS(f'{label}: {baseline_ms / ms if ms else float("inf"):.1f}x'))
+
+
+def create_benchmark_user(email='benchmark@example.com'):
+    return get_user_model().objects.create_user(email=email, password='benchmark')
+
+
+def seed_recipes(user, count, tags=50, ingredients=100, tags_per_recipe=3, ingredients_per_recipe=5, seed=0):
+    """Bulk insert `count` recipes with randomly linked tags and ingredients and return their ids."""
+    rng = random.Random(seed)
+
+    Tag.objects.bulk_create([Tag(user=user, name=f'tag {i}') for i in range(tags)])
+    Ingredient.objects.bulk_create([Ingredient(user=user, name=f'ingredient {i}') for i in range(ingredients)])
+    tag_ids = list(Tag.objects.filter(user=user).values_list('id', flat=True))
+    ingredient_ids = list(Ingredient.objects.filter(user=user).values_list('id', flat=True))
+
+    for start in range(0, count, BATCH_SIZE):
+        Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=f'Recipe {i}',
+                time_in_minutes=rng.randint(5, 120),
+                price=Decimal(rng.randint(100, 9999)) / 100,
+                description='Some long description of the recipe. ' * 10,
+            )
+            for i in range(start, min(start + BATCH_SIZE, count))
+        ])
+
+    recipe_ids = list(Recipe.objects.filter(user=user).order_by('id').values_list('id', flat=True))
+
+    for relation, ids, per_recipe in (
+        (Recipe.tags, tag_ids, tags_per_recipe),
+        (Recipe.ingredients, ingredient_ids, ingredients_per_recipe),
+    ):
+        through = relation.through
+        column = relation.field.m2m_reverse_name()
+        links = []
+
+        for recipe_id in recipe_ids:
+            links.extend(through(recipe_id=recipe_id, **{column: related_id}) for related_id in rng.sample(ids, min(per_recipe, len(ids))))
+
+            if len(links) >= BATCH_SIZE:
+                through.objects.bulk_create(links)
+                links = []
+
+        through.objects.bulk_create(links)
+
+    return recipe_ids
+
+
+def recipe_payload(size, seed=0):
+    """Build a list of serialized recipes whose JSON encoding is roughly `size` bytes."""
+    rng = random.Random(seed)
+    recipes, total = [], 2
+
+    while total < size:
+        i = len(recipes)
+        recipe = {
+            'id': i + 1,
+            'title': f'Recipe {i}',
+            'time_in_minutes': rng.randint(5, 120),
+            'price': f'{rng.randint(100, 9999) / 100:.2f}',
+            'link': f'https://example.com/recipes/{i}',
+            'tags': [{'id': rng.randint(1, 50), 'name': f'tag {rng.randint(1, 50)}'} for _ in range(3)],
+            'ingredients': [{'id': rng.randint(1, 100), 'name': f'ingredient {rng.randint(1, 100)}'} for _ in range(5)],
+            'description': 'Some long description of the recipe. ' * 10,
+            'image': None,
+        }
+        recipes.append(recipe)
+        total += len(json.dumps(recipe, separators=(',', ':'))) + 1
+
+    return recipes
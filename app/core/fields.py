@@ -0,0 +1,16 @@
+from django.contrib.postgres.search import SearchVectorField
+
+
+class SearchDocumentField(SearchVectorField):
+    """
+    Stored search document for a row.
+
+    A `tsvector` on PostgreSQL. Other backends have no full-text type, so the
+    column falls back to plain text holding the lowercased document.
+    """
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return super().db_type(connection)
+
+        return 'text'
@@ -0,0 +1,141 @@
+"""
+Host-wide admission limit for password hashing
+"""
+import errno
+import logging
+import os
+import random
+import stat
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import Throttled
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - flock is POSIX only, slots are then per process
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MAX_CONCURRENT': os.cpu_count() or 2,
+    'RETRY_AFTER': 1,
+    # A directory owned by the app user; without one the slots are per process.
+    'LOCK_DIR': None,
+}
+
+
+class PasswordHashingBusy(Throttled):
+    default_detail = _('Too many password checks in progress, try again shortly.')
+    default_code = 'password_hashing_busy'
+
+
+class PasswordHashingLimiter:
+    """
+    Caps the number of password hashes in progress on the host.
+
+    A hash is CPU bound and runs on the request worker, so under sync workers
+    the only lever is admission. Each hash takes one of `MAX_CONCURRENT`
+    slots, lock files in `LOCK_DIR` held with `flock()`, which every worker
+    process on the host shares. When all of them are taken the caller gets
+    `PasswordHashingBusy` (429 with a Retry-After header) right away instead
+    of adding a hash to a saturated CPU. The kernel releases the slots of a
+    process that dies, so they cannot leak.
+
+    `LOCK_DIR` must be owned by the app user and writable by nobody else,
+    otherwise another local user could hold every slot. Without `fcntl`, a
+    `LOCK_DIR`, or when the directory fails those checks, the slots fall back
+    to a per-process semaphore.
+
+    Only the API views take a slot; the admin and management commands hash
+    without a limit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._semaphore = None
+        self._stats = {'completed': 0, 'rejected': 0}
+
+    @property
+    def options(self):
+        return {**DEFAULTS, **getattr(settings, 'PASSWORD_HASHING', {})}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _check_lock_dir(self, path):
+        """Create `path`, or make sure an existing one is a directory only this user can write to."""
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.lstat(path)
+
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.geteuid() or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise PermissionError(errno.EPERM, 'Not a directory owned and only writable by the current user', path)
+
+    def _acquire_file(self, path, count):
+        self._check_lock_dir(path)
+        # Start at a random slot so concurrent callers do not all contend for the first ones.
+        start = random.randrange(count)
+
+        for i in range(count):
+            fd = os.open(os.path.join(path, f'slot-{(start + i) % count}'), os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            except OSError:
+                os.close(fd)
+                raise
+
+            # Closing the descriptor releases the lock.
+            return partial(os.close, fd)
+
+        return None
+
+    def _acquire_semaphore(self, count):
+        with self._lock:
+            if self._semaphore is None:
+                self._semaphore = threading.BoundedSemaphore(count)
+
+        return self._semaphore.release if self._semaphore.acquire(blocking=False) else None
+
+    def _acquire(self, options):
+        """Take a free slot and return the callable releasing it, or None when every slot is taken."""
+        if fcntl is not None and options['LOCK_DIR']:
+            try:
+                return self._acquire_file(options['LOCK_DIR'], options['MAX_CONCURRENT'])
+            except OSError as exc:
+                logger.error('Cannot use password hashing slots in %s, limiting per process: %s', options['LOCK_DIR'], exc)
+
+        return self._acquire_semaphore(options['MAX_CONCURRENT'])
+
+    @contextmanager
+    def slot(self):
+        """Hold a hashing slot for the duration of the block, or raise `PasswordHashingBusy`."""
+        options = self.options
+        release = self._acquire(options)
+
+        if release is None:
+            self._count('rejected')
+            raise PasswordHashingBusy(wait=options['RETRY_AFTER'])
+
+        try:
+            yield
+        finally:
+            release()
+
+        self._count('completed')
+
+
+password_hashing = PasswordHashingLimiter()
@@ -0,0 +1,47 @@
+"""
+Benchmark the JSON renderer and parser against DRF's stdlib based ones
+"""
+from io import BytesIO
+
+from django.test import override_settings
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmark import BenchmarkCommand, recipe_payload
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+class Command(BenchmarkCommand):
+    help = 'Compare throughput and peak memory of the JSON renderer and parser with the DRF defaults.'
+    repeat = 3
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--sizes', type=float, nargs='+', default=[1, 50], help='Payload sizes in MB')
+
+    def benchmark(self, sizes, **options):
+        for size in sizes:
+            data = recipe_payload(int(size * 1024 * 1024))
+            body = JSONRenderer().render(data)
+            mb = len(body) / 1024 / 1024
+            self.stdout.write(f'{len(data)} recipes, {mb:.1f} MB')
+
+            cases = (
+                ('render', JSONRenderer, FastJSONRenderer, lambda renderer: renderer().render(data)),
+                ('parse', JSONParser, FastJSONParser, lambda parser: parser().parse(BytesIO(body))),
+            )
+
+            # Benchmark payloads exceed the request body limit on purpose.
+            with override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=None):
+                for action, baseline, fast, run in cases:
+                    results = {}
+                    for cls in (baseline, fast):
+                        ms, result = self.measure(lambda: run(cls))
+                        peak = self.peak_memory(lambda: run(cls))
+                        results[cls] = ms, result
+                        self.report(f'{action} {cls.__module__}', ms, mb_per_s=f'{mb / ms * 1000:.0f}', peak_mb=f'{peak / 1024 / 1024:.1f}')
+
+                    assert results[baseline][1] == results[fast][1], f'{action} results differ'
+                    self.compare(f'{action} speedup', results[baseline][0], results[fast][0])
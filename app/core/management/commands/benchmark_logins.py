@@ -0,0 +1,71 @@
+"""
+Benchmark password checks of concurrent logins with and without the hashing limit
+"""
+import math
+import statistics
+import threading
+import time
+
+from django.contrib.auth.hashers import check_password, make_password
+
+from core.benchmark import BenchmarkCommand
+from core.hashing import PasswordHashingBusy, password_hashing
+
+
+def limited_check(encoded):
+    with password_hashing.slot():
+        return check_password('password123', encoded)
+
+
+class Command(BenchmarkCommand):
+    help = 'Compare login throughput, latency and shedding of unlimited password checks with the host-wide hashing limit.'
+    repeat = 1
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--concurrency', type=int, default=16, help='Number of concurrent clients')
+        parser.add_argument('--logins', type=int, default=10, help='Logins per client')
+
+    def benchmark(self, concurrency, logins, **options):
+        encoded = make_password('password123')
+        self.stdout.write(f'{concurrency} clients x {logins} logins, limit options {password_hashing.options}')
+
+        cases = (
+            ('inline', lambda: check_password('password123', encoded)),
+            ('limited', lambda: limited_check(encoded)),
+        )
+
+        for label, login in cases:
+            latencies, rejected = [], []
+            lock = threading.Lock()
+
+            def client():
+                for _ in range(logins):
+                    start = time.perf_counter()
+                    try:
+                        login()
+                    except PasswordHashingBusy:
+                        with lock:
+                            rejected.append(time.perf_counter() - start)
+                        continue
+                    with lock:
+                        latencies.append(time.perf_counter() - start)
+
+            def run():
+                threads = [threading.Thread(target=client) for _ in range(concurrency)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+            ms, _result = self.measure(run)
+            latencies.sort()
+            self.report(
+                label, ms,
+                logins_per_s=f'{len(latencies) / ms * 1000:.0f}',
+                p50_ms=f'{statistics.median(latencies) * 1000:.1f}' if latencies else '-',
+                # Nearest rank: the smallest sample at or above 99% of them.
+                p99_ms=f'{latencies[math.ceil(len(latencies) * 0.99) - 1] * 1000:.1f}' if latencies else '-',
+                shed=len(rejected),
+                shed_max_ms=f'{max(rejected) * 1000:.2f}' if rejected else '-',
+            )
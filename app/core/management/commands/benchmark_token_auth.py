@@ -0,0 +1,57 @@
+"""
+Benchmark token authentication with and without the token cache
+"""
+from django.db import connection
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from core.authentication import CachedTokenAuthentication, token_cache
+from core.benchmark import BenchmarkCommand, create_benchmark_user
+
+
+class Command(BenchmarkCommand):
+    help = 'Compare queries and time per request of TokenAuthentication and CachedTokenAuthentication.'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--requests', type=int, default=1000, help='Authenticated requests per run')
+
+    def benchmark(self, requests, **options):
+        user = create_benchmark_user()
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        token_cache.clear()
+
+        def run(authentication, read_data_version):
+            def authenticate():
+                for _ in range(requests):
+                    authenticated, _token = authentication.authenticate(request)
+                    if read_data_version:
+                        authenticated.data_version
+            return authenticate
+
+        self.stdout.write(f'{requests} requests per run')
+
+        # Recipe views read the data version for their ETags and response cache keys, the profile view does not.
+        for view, read_data_version in (('profile', False), ('recipe views', True)):
+            results = {}
+
+            for label, authentication in (('TokenAuthentication', TokenAuthentication()), ('CachedTokenAuthentication', CachedTokenAuthentication())):
+                # Measure the steady state: the first request of a token always reaches the database.
+                authentication.authenticate(request)
+                queries = []
+
+                def count_queries(execute, sql, params, many, context):
+                    queries.append(sql)
+                    return execute(sql, params, many, context)
+
+                with connection.execute_wrapper(count_queries):
+                    ms, _result = self.measure(run(authentication, read_data_version))
+
+                results[label] = ms
+                self.report(f'{view}: {label}', ms, queries_per_request=f'{len(queries) / (requests * self.repeat):.3f}')
+
+            self.compare(f'{view} speedup', results['TokenAuthentication'], results['CachedTokenAuthentication'])
+
+        self.stdout.write(f'cache stats: {token_cache.stats()}')
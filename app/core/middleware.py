@@ -0,0 +1,149 @@
+"""
+Compression of API responses
+"""
+import gzip
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, gzip is always available
+    brotli = None
+
+
+DEFAULTS = {
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    # Only API responses: compressing pages that mix secrets such as CSRF
+    # tokens with reflected input would expose them to BREACH.
+    'PATHS': ('/api/',),
+    'CONTENT_TYPES': ('application/json', 'application/x-ndjson', 'application/msgpack', 'text/csv'),
+}
+
+
+def compression_options():
+    return {**DEFAULTS, **getattr(settings, 'RESPONSE_COMPRESSION', {})}
+
+
+def available_encodings():
+    """Supported encodings, preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding, available):
+    """Pick the encoding of `available` with the highest quality in an Accept-Encoding header, earlier ones winning ties."""
+    qualities = {}
+
+    for item in accept_encoding.split(','):
+        name, _sep, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _sep, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+
+    return best
+
+
+def compress(encoding, data, options):
+    if encoding == 'br':
+        return brotli.compress(data, quality=options['BROTLI_QUALITY'])
+
+    # A fixed mtime keeps the output deterministic, so cached variants can be compared.
+    return gzip.compress(data, compresslevel=options['GZIP_LEVEL'], mtime=0)
+
+
+def compress_stream(encoding, chunks, options):
+    """Compress an iterable of byte chunks lazily, emitting output as the compressor fills its buffer."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=options['BROTLI_QUALITY'])
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(options['GZIP_LEVEL'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process, finish = compressor.compress, compressor.flush
+
+    for chunk in chunks:
+        data = process(chunk)
+        if data:
+            yield data
+
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with brotli (when installed) or gzip, as negotiated through Accept-Encoding.
+
+    Bodies under `RESPONSE_COMPRESSION['MIN_SIZE']` are sent as they are and
+    streaming responses are compressed chunk by chunk. A response can carry
+    already compressed bodies in `compressed_variants` (encoding -> bytes) and
+    a `store_compressed(encoding, body)` callback to keep new ones, which the
+    response cache uses so hits are not compressed again.
+
+    Only responses under `PATHS` with one of `CONTENT_TYPES`, and 304s under
+    `PATHS`, are touched. Those always get `Vary: Accept-Encoding` and, when
+    the client accepts an encoding, a weak ETag whether or not the body ends
+    up compressed, so a 304 carries the same validators as the 200 it
+    revalidates.
+    """
+
+    def is_compressible(self, request, response, options):
+        if not request.path.startswith(tuple(options['PATHS'])) or response.has_header('Content-Encoding'):
+            return False
+
+        content_type = response.get('Content-Type', '').partition(';')[0].strip().lower()
+        return response.status_code == 304 or content_type in options['CONTENT_TYPES']
+
+    def process_response(self, request, response):
+        options = compression_options()
+        if not self.is_compressible(request, response, options):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), available_encodings())
+        if encoding is None:
+            return response
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+
+        if response.status_code == 304 or (not response.streaming and len(response.content) < options['MIN_SIZE']):
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(encoding, response.streaming_content, options)
+            del response['Content-Length']
+        else:
+            variants = getattr(response, 'compressed_variants', None) or {}
+            body = variants.get(encoding)
+
+            if body is None:
+                body = compress(encoding, response.content, options)
+                store = getattr(response, 'store_compressed', None)
+                if store is not None:
+                    store(encoding, body)
+
+            if len(body) >= len(response.content):
+                return response
+
+            response.content = body
+            response['Content-Length'] = str(len(body))
+
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,83 @@
+import core.fields
+import django.contrib.postgres.indexes
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import Aggregate, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat, Lower
+
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx')
+
+
+def add_search_index(apps, schema_editor):
+    # GIN only exists on PostgreSQL; other backends search the plain text document without an index.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('core', 'Recipe'), SEARCH_INDEX)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('core', 'Recipe'), SEARCH_INDEX)
+
+
+# The backfill below is a frozen copy of core.search.refresh_search_vectors as
+# of this migration, so later changes to the live code do not alter it.
+
+class GroupConcat(Aggregate):
+    function = 'GROUP_CONCAT'
+    template = "%(function)s(%(expressions)s, ' ')"
+    output_field = TextField()
+
+
+def related_names(apps, vendor, model_name):
+    aggregate = StringAgg('name', ' ') if vendor == 'postgresql' else GroupConcat('name')
+    names = apps.get_model('core', model_name).objects.filter(recipe=OuterRef('pk')).values('recipe').annotate(names=aggregate).values('names')
+
+    return Coalesce(Subquery(names), Value(''), output_field=TextField())
+
+
+def backfill_search_vectors(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    recipes = apps.get_model('core', 'Recipe').objects.using(schema_editor.connection.alias)
+
+    if vendor == 'postgresql':
+        recipes.update(search_vector=(
+            SearchVector('title', weight='A', config='english')
+            + SearchVector(related_names(apps, vendor, 'Tag'), weight='B', config='english')
+            + SearchVector(related_names(apps, vendor, 'Ingredient'), weight='B', config='english')
+            + SearchVector('description', weight='C', config='english')
+        ))
+        return
+
+    recipes.update(search_vector=Lower(Concat(
+        'title', Value(' '),
+        related_names(apps, vendor, 'Tag'), Value(' '),
+        related_names(apps, vendor, 'Ingredient'), Value(' '),
+        'description',
+        output_field=TextField(),
+    )))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_m2m_reverse_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=core.fields.SearchDocumentField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='recipe', index=SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_search_index, remove_search_index),
+            ],
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+    ]
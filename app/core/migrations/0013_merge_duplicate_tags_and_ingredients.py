@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Fold every (user, name) duplicate into its oldest row, moving the recipe links over."""
+    Recipe = apps.get_model('core', 'Recipe')
+
+    for model_name, relation in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, relation).through
+        column = Recipe._meta.get_field(relation).m2m_reverse_name()
+        duplicates = model.objects.values('user', 'name').annotate(keep=Min('id'), rows=Count('id')).filter(rows__gt=1)
+
+        for duplicate in list(duplicates):
+            keep = duplicate['keep']
+            merged = list(model.objects.filter(user=duplicate['user'], name=duplicate['name']).exclude(pk=keep).values_list('id', flat=True))
+            linked = set(through.objects.filter(**{column: keep}).values_list('recipe_id', flat=True))
+            moved = set(through.objects.filter(**{f'{column}__in': merged}).values_list('recipe_id', flat=True)) - linked
+
+            through.objects.bulk_create([through(recipe_id=recipe_id, **{column: keep}) for recipe_id in moved])
+            through.objects.filter(**{f'{column}__in': merged}).delete()
+            model.objects.filter(pk__in=merged).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_user_initial_data_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+# Matches the `UPPER("name"::text) LIKE UPPER('prefix%')` PostgreSQL generates for `name__istartswith`.
+PREFIX_INDEXES = (
+    ('tag_user_name_prefix_idx', 'core_tag'),
+    ('ingredient_user_name_prefix_idx', 'core_ingredient'),
+)
+
+
+def add_prefix_indexes(apps, schema_editor):
+    # text_pattern_ops only exists on PostgreSQL; other backends fall back to the (user, name, id) index.
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, table in PREFIX_INDEXES:
+            schema_editor.execute(f'CREATE INDEX {name} ON {table} (user_id, UPPER(name::text) text_pattern_ops)')
+
+
+def remove_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, _table in PREFIX_INDEXES:
+            schema_editor.execute(f'DROP INDEX {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_tag_ingredient_user_name_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_prefix_indexes, remove_prefix_indexes),
+    ]
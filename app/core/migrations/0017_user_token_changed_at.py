@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-17 09:12
+
+from django.db import migrations, models
+from django.db.models import Q
+from django.utils import timezone
+
+
+def stamp_revoked_users(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    User.objects.filter(Q(token_version__gt=0) | Q(is_active=False)).update(token_changed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_user_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_changed_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('token_changed_at__isnull', False)), fields=['token_changed_at'], name='user_token_changed_at_idx'),
+        ),
+        migrations.RunPython(stamp_revoked_users, migrations.RunPython.noop),
+    ]
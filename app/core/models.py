@@ -1,10 +1,29 @@
 import os
+import secrets
 import uuid
 
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.db.models import F, Q
+from django.dispatch import Signal
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.conf import settings
 
+from core.fields import SearchDocumentField
+
+
+# Sent with `user_id` whenever data owned by that user changes.
+user_data_changed = Signal()
+
+DATA_VERSION_FIELDS = {'data_version', 'data_modified_at'}
+
+
+def initial_data_version():
+    # Start every account at a random version so cached entries of a deleted
+    # account can never be mistaken for those of a new one reusing its id.
+    return secrets.randbits(48)
+
 
 def recipe_image_file_path(instance, filename):
     ext = os.path.splitext(filename)[1]
@@ -37,17 +56,51 @@ class UserManager(BaseUserManager):
 
         return user
 
+    def bump_data_version(self, user_id):
+        """Record that data owned by the user changed, invalidating their ETags."""
+        self.filter(pk=user_id).update(data_version=F('data_version') + 1, data_modified_at=timezone.now())
+        user_data_changed.send(sender=self.model, user_id=user_id)
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(max_length=255, unique=True)
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    data_version = models.PositiveBigIntegerField(default=initial_data_version, editable=False)
+    data_modified_at = models.DateTimeField(null=True, editable=False)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
+    # Set whenever the token version or activity changes, so `TokenVersions` only reloads those users.
+    token_changed_at = models.DateTimeField(null=True, editable=False)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['token_changed_at'], name='user_token_changed_at_idx', condition=Q(token_changed_at__isnull=False)),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        saves_activity = 'is_active' not in self.get_deferred_fields() and (update_fields is None or 'is_active' in update_fields)
+
+        # A new active user has no tokens to revoke yet.
+        if saves_activity and not (self._state.adding and self.is_active):
+            self.token_changed_at = timezone.now()
+            if update_fields is not None:
+                kwargs['update_fields'] = [*update_fields, 'token_changed_at']
+
+        super().save(*args, **kwargs)
+
+    def refresh_from_db(self, using=None, fields=None):
+        # The data version and its timestamp are read as a pair, so a deferred load of one brings in both.
+        if fields is not None and DATA_VERSION_FIELDS & set(fields):
+            fields = [*fields, *(DATA_VERSION_FIELDS - set(fields))]
+
+        super().refresh_from_db(using=using, fields=fields)
+
 
 class Recipe(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -59,6 +112,13 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    search_vector = SearchDocumentField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='recipe_user_id_desc_idx'),
+            GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -68,6 +128,14 @@ class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'], name='tag_user_name_id_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='tag_user_name_uniq'),
+        ]
+
     def __str__(self) -> str:
         return self.name
 
@@ -76,5 +144,13 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'], name='ingredient_user_name_id_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='ingredient_user_name_uniq'),
+        ]
+
     def __str__(self) -> str:
         return self.name
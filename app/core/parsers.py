@@ -0,0 +1,103 @@
+"""
+API parsers: JSON backed by orjson when it is installed, and MessagePack
+"""
+import msgpack
+
+from django.conf import settings
+
+from rest_framework import exceptions, parsers, status
+from rest_framework.utils import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib decoder is the fallback
+    orjson = None
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RequestTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Request body too large.'
+    default_code = 'request_too_large'
+
+
+def read_body(stream, parser_context, max_size=None):
+    """
+    Read the whole request body, refusing anything over `max_size` bytes.
+
+    `max_size` defaults to `DATA_UPLOAD_MAX_MEMORY_SIZE`, which Django only
+    checks when `request.body` is read, not for the stream DRF parsers get.
+    A declared Content-Length over the limit is refused before reading.
+    """
+    if max_size is None:
+        max_size = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+    if stream is None:
+        return b''
+    if max_size is None:
+        return stream.read()
+
+    request = (parser_context or {}).get('request')
+    try:
+        declared = int(request.META.get('CONTENT_LENGTH') or 0) if request is not None else 0
+    except ValueError:
+        declared = 0
+
+    if declared > max_size:
+        raise RequestTooLarge()
+
+    chunks, size = [], 0
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+
+        size += len(chunk)
+        if size > max_size:
+            raise RequestTooLarge()
+        chunks.append(chunk)
+
+    return b''.join(chunks)
+
+
+def loads(body, encoding='utf-8', strict=True):
+    """Decode a JSON document, raising ValueError on invalid input like `json.loads`."""
+    if orjson is not None and strict and encoding.lower().replace('_', '-') in ('utf-8', 'utf8'):
+        return orjson.loads(body)
+
+    return json.loads(body.decode(encoding), parse_constant=json.strict_constant if strict else None)
+
+
+class FastJSONParser(parsers.JSONParser):
+    """
+    Drop-in replacement for DRF's `JSONParser` with a request body size limit.
+
+    UTF-8 bodies are decoded with orjson. Like DRF in strict mode, `NaN` and
+    `Infinity` are rejected.
+    """
+    max_body_size = None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        body = read_body(stream, parser_context, self.max_body_size)
+
+        try:
+            return loads(body, encoding, self.strict)
+        except ValueError as exc:
+            raise exceptions.ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackParser(parsers.BaseParser):
+    """Parses `application/msgpack` bodies, with the same size limit as the JSON parser."""
+    media_type = 'application/msgpack'
+    max_body_size = None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        body = read_body(stream, parser_context, self.max_body_size)
+
+        try:
+            return msgpack.unpackb(body, raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise exceptions.ParseError(f'MessagePack parse error - {exc}')
@@ -0,0 +1,75 @@
+"""
+API renderers: JSON backed by orjson when it is installed, and MessagePack
+"""
+import decimal
+
+import msgpack
+
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib encoder is the fallback
+    orjson = None
+
+
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    Drop-in replacement for DRF's `JSONRenderer` producing the same bytes.
+
+    orjson encodes dicts, lists, strings and numbers natively; everything it
+    does not know, such as `Decimal`, lazy translation strings and datetimes
+    (passed through so they keep DRF's millisecond `Z` format), goes through
+    DRF's encoder. Indented or ASCII-only output uses the stdlib encoder.
+    """
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+    default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if orjson is None or self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.options)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits and other values orjson refuses.
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep the output a strict javascript subset like DRF does.
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+
+        return ret
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """
+    Renders `application/msgpack`.
+
+    Types without a MessagePack counterpart are converted like the JSON
+    renderer does, except `Decimal`, which is sent as its exact string.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def default(self, obj):
+        if isinstance(obj, decimal.Decimal):
+            return str(obj)
+
+        return JSONEncoder().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=self.default, use_bin_type=True)
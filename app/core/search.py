@@ -0,0 +1,63 @@
+"""
+Full-text search over recipes
+"""
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Aggregate, Case, F, FloatField, OuterRef, Subquery, TextField, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat, Lower
+
+
+SEARCH_CONFIG = 'english'
+
+
+class GroupConcat(Aggregate):
+    """SQLite counterpart of StringAgg joining values with a space."""
+    function = 'GROUP_CONCAT'
+    template = "%(function)s(%(expressions)s, ' ')"
+    output_field = TextField()
+
+
+def _related_names(model, relation):
+    related = model._meta.get_field(relation).related_model
+    aggregate = StringAgg('name', ' ') if connection.vendor == 'postgresql' else GroupConcat('name')
+    names = related.objects.filter(recipe=OuterRef('pk')).values('recipe').annotate(names=aggregate).values('names')
+
+    return Coalesce(Subquery(names), Value(''), output_field=TextField())
+
+
+def refresh_search_vectors(queryset):
+    """Recompute the stored search document of every recipe in `queryset`."""
+    if connection.vendor == 'postgresql':
+        queryset.update(search_vector=(
+            SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector(_related_names(queryset.model, 'tags'), weight='B', config=SEARCH_CONFIG)
+            + SearchVector(_related_names(queryset.model, 'ingredients'), weight='B', config=SEARCH_CONFIG)
+            + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+        ))
+        return
+
+    queryset.update(search_vector=Lower(Concat(
+        'title', Value(' '),
+        _related_names(queryset.model, 'tags'), Value(' '),
+        _related_names(queryset.model, 'ingredients'), Value(' '),
+        'description',
+        output_field=TextField(),
+    )))
+
+
+def search_recipes(queryset, text):
+    """Filter `queryset` down to recipes matching `text` and annotate them with a `rank`."""
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        # ts_rank returns a real; as double precision the rank survives the JSON round trip of a keyset cursor exactly.
+        return queryset.filter(search_vector=query).annotate(rank=Cast(SearchRank(F('search_vector'), query), FloatField()))
+
+    terms = text.lower().split()
+    rank = Value(0.0, output_field=FloatField())
+
+    for term in terms:
+        queryset = queryset.filter(search_vector__contains=term)
+        rank = rank + Case(When(title__icontains=term, then=Value(1.0)), default=Value(0.1), output_field=FloatField())
+
+    return queryset.annotate(rank=rank)
@@ -0,0 +1,167 @@
+"""
+Keep denormalised recipe data in sync with writes
+"""
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_user_tokens, token_cache
+from core.models import Recipe, Tag, Ingredient, User
+from core.search import refresh_search_vectors
+from core.tokens import REVOKED, token_versions
+
+
+SEARCHED_RECIPE_FIELDS = {'title', 'description'}
+
+
+class PendingChanges(threading.local):
+    """Recipes to reindex and users to bump once the current thread's transaction commits."""
+
+    def __init__(self):
+        self.user_ids = set()
+        self.recipe_ids = set()
+        self.linked_recipes_scheduled = False
+
+
+pending_changes = PendingChanges()
+
+
+def _apply_pending_changes(user_ids, recipe_ids):
+    recipe_ids = pending_changes.recipe_ids.intersection(recipe_ids)
+    user_ids = pending_changes.user_ids.intersection(user_ids)
+    pending_changes.recipe_ids -= recipe_ids
+    pending_changes.user_ids -= user_ids
+
+    # Reindex first, so a reader seeing the new data version also finds the new search vectors.
+    if recipe_ids:
+        refresh_search_vectors(Recipe.objects.filter(pk__in=recipe_ids))
+
+    for user_id in sorted(user_ids):
+        get_user_model().objects.bump_data_version(user_id)
+
+
+def _on_commit(user_ids=(), recipe_ids=()):
+    user_ids, recipe_ids = tuple(user_ids), tuple(recipe_ids)
+    if not user_ids and not recipe_ids:
+        return
+
+    pending_changes.user_ids.update(user_ids)
+    pending_changes.recipe_ids.update(recipe_ids)
+    # Every schedule gets its own callback, so the work survives the rollback
+    # of a savepoint that scheduled it first; the later ones find it done.
+    transaction.on_commit(partial(_apply_pending_changes, user_ids, recipe_ids))
+
+
+def bump_data_version_on_commit(user_id):
+    """
+    Bump the data version of the user once the current transaction commits.
+
+    A user scheduled several times in one transaction is bumped once, after
+    the commit, so a write touching a recipe and its links updates the user
+    row a single time and never holds its lock for the rest of the
+    transaction. Outside a transaction the bump happens right away.
+    """
+    _on_commit(user_ids=(user_id,))
+
+
+def refresh_search_vectors_on_commit(recipe_ids):
+    """Recompute the search documents of `recipe_ids` once the current transaction commits, each recipe once."""
+    _on_commit(recipe_ids=recipe_ids)
+
+
+@contextmanager
+def linked_recipes_scheduled():
+    """
+    Skip the lookup of linked recipes for each tag or ingredient deleted in the block.
+
+    For set-based deletes whose caller already scheduled the recipes linked to
+    the deleted rows, so deleting many rows does not cost a query per row.
+    """
+    pending_changes.linked_recipes_scheduled = True
+    try:
+        yield
+    finally:
+        pending_changes.linked_recipes_scheduled = False
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or SEARCHED_RECIPE_FIELDS & set(update_fields):
+        refresh_search_vectors_on_commit((instance.pk,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        refresh_search_vectors_on_commit((instance.pk,))
+    else:
+        recipe_ids = instance.__dict__.pop('_cleared_recipe_ids', []) if action == 'post_clear' else pk_set
+        refresh_search_vectors_on_commit(recipe_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def recipe_attr_saved(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_vectors_on_commit(Recipe.objects.filter(**{f'{sender._meta.model_name}s': instance}).values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_attr_deleting(sender, instance, **kwargs):
+    if pending_changes.linked_recipes_scheduled:
+        return
+
+    instance._linked_recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_attr_deleted(sender, instance, **kwargs):
+    refresh_search_vectors_on_commit(instance.__dict__.pop('_linked_recipe_ids', []))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def user_data_saved(sender, instance, **kwargs):
+    bump_data_version_on_commit(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def user_data_links_changed(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_data_version_on_commit(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_user_tokens(instance.pk)
+
+    if 'is_active' not in instance.get_deferred_fields() and not instance.is_active:
+        token_versions.set(instance.pk, REVOKED)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
@@ -0,0 +1,113 @@
+"""
+Tests for cached token authentication
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+
+
+ME_URL = reverse('user:me')
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        token_cache.reset_stats()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123', name='name')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get(self, url=ME_URL):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+
+        return res, [q['sql'] for q in ctx.captured_queries]
+
+    def test_repeated_token_skips_the_database(self):
+        first, first_sql = self.get()
+        second, second_sql = self.get()
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(len(first_sql), 1)
+        self.assertEqual(second_sql, [])
+        self.assertEqual(token_cache.stats()['local_hits'], 1)
+
+    def test_data_version_is_loaded_fresh(self):
+        self.get(RECIPE_URL)
+        get_user_model().objects.bump_data_version(self.user.pk)
+
+        res, sql = self.get(RECIPE_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len([query for query in sql if 'core_user' in query]), 1)
+        self.assertIn('data_modified_at', sql[0])
+
+    def test_cache_holds_no_credentials(self):
+        self.get()
+
+        key, (_expires, entry) = next(iter(token_cache._local.items()))
+
+        self.assertNotIn(self.token.key, key)
+        self.assertNotIn(self.user.password, repr(entry))
+
+    def test_token_deletion_invalidates(self):
+        self.get()
+        self.token.delete()
+
+        self.assertEqual(self.get()[0].status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_user_invalidates(self):
+        self.get()
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.get()[0].status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_invalidates(self):
+        self.get()
+
+        self.client.patch(ME_URL, {'name': 'new name', 'password': 'newpassword123'})
+        res, sql = self.get()
+
+        self.assertEqual(res.data['name'], 'new name')
+        self.assertEqual(len(sql), 1)
+
+    @override_settings(TOKEN_AUTH_CACHE={'CACHE_ALIAS': 'default'})
+    def test_shared_cache(self):
+        caches['default'].clear()
+        self.get()
+        token_cache.clear()
+
+        res, sql = self.get()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sql, [])
+        self.assertEqual(token_cache.stats()['shared_hits'], 1)
+
+        self.token.delete()
+        token_cache.clear()
+        self.assertEqual(self.get()[0].status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_CACHE={'MAX_ENTRIES': 1})
+    def test_local_cache_is_bounded(self):
+        other = get_user_model().objects.create_user(email='other@example.com', password='password123')
+        other_client = APIClient()
+        other_client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+
+        self.get()
+        other_client.get(ME_URL)
+
+        self.assertEqual(len(token_cache._local), 1)
+        self.assertEqual(len(self.get()[1]), 1)
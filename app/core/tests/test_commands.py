@@ -2,13 +2,14 @@
 Test custom commands
 """
 
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
 from django.core.management import call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, override_settings
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -31,3 +32,40 @@ class CommandTest(SimpleTestCase):
         self.assertEqual(patched_sleep.call_count, 5)
 
         patched_check.assert_called_with(databases=['default'])
+
+
+class BenchmarkJSONCommandTest(SimpleTestCase):
+    databases = ['default']
+
+    def test_benchmark_json(self):
+        out = StringIO()
+
+        call_command('benchmark_json', sizes=[0.01], repeat=1, stdout=out)
+
+        self.assertIn('render speedup', out.getvalue())
+        self.assertIn('parse speedup', out.getvalue())
+
+
+class BenchmarkTokenAuthCommandTest(SimpleTestCase):
+    databases = ['default']
+
+    def test_benchmark_token_auth(self):
+        out = StringIO()
+
+        call_command('benchmark_token_auth', requests=5, repeat=1, stdout=out)
+
+        self.assertIn('profile: CachedTokenAuthentication', out.getvalue())
+        self.assertIn('queries_per_request=0.000', out.getvalue())
+
+
+class BenchmarkLoginsCommandTest(SimpleTestCase):
+    databases = ['default']
+
+    def test_benchmark_logins(self):
+        out = StringIO()
+
+        with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            call_command('benchmark_logins', concurrency=2, logins=2, stdout=out)
+
+        self.assertIn('inline', out.getvalue())
+        self.assertIn('limited', out.getvalue())
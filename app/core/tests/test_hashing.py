@@ -0,0 +1,172 @@
+"""
+Tests for the password hashing limit
+"""
+import fcntl
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hasher, make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.hashing import PasswordHashingBusy, password_hashing
+
+
+TOKEN_URL = reverse('user:token')
+CREATE_USER_URL = reverse('user:create')
+
+HASHERS = ['django.contrib.auth.hashers.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class PasswordHashingTest(TestCase):
+    def setUp(self):
+        lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(lock_dir.cleanup)
+        self.options = {'MAX_CONCURRENT': 2, 'RETRY_AFTER': 3, 'LOCK_DIR': lock_dir.name}
+        settings = override_settings(PASSWORD_HASHING=self.options)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+
+    def login(self, password='password123'):
+        return self.client.post(TOKEN_URL, {'email': 'user@example.com', 'password': password})
+
+    def take_slots(self):
+        """Hold every slot the way other worker processes on the host would."""
+        fds = []
+        for i in range(self.options['MAX_CONCURRENT']):
+            fd = os.open(os.path.join(self.options['LOCK_DIR'], f'slot-{i}'), os.O_RDWR | os.O_CREAT)
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fds.append(fd)
+
+        return fds
+
+    def release_slots(self, fds):
+        for fd in fds:
+            os.close(fd)
+
+    def test_login_and_signup_take_a_slot(self):
+        completed = password_hashing.stats()['completed']
+
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.login('wrong').status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(password_hashing.stats()['completed'], completed + 2)
+
+    def test_slots_held_by_other_processes_shed_with_429(self):
+        self.login()
+        fds = self.take_slots()
+
+        try:
+            res = self.login()
+            signup = self.client.post(CREATE_USER_URL, {'email': 'new@example.com', 'password': 'password123', 'name': 'new'})
+        finally:
+            self.release_slots(fds)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '3')
+        self.assertEqual(signup.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(get_user_model().objects.filter(email='new@example.com').exists())
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    def test_model_hashing_is_not_limited(self):
+        fds = self.take_slots()
+
+        try:
+            self.user.set_password('newpassword')
+            valid = self.user.check_password('newpassword')
+        finally:
+            self.release_slots(fds)
+
+        self.assertTrue(valid)
+
+    def test_only_completed_hashes_are_counted(self):
+        stats = password_hashing.stats()
+
+        with self.assertRaises(ValueError):
+            with password_hashing.slot():
+                raise ValueError()
+
+        fds = self.take_slots()
+        try:
+            with self.assertRaises(PasswordHashingBusy):
+                with password_hashing.slot():
+                    pass
+        finally:
+            self.release_slots(fds)
+
+        self.assertEqual(password_hashing.stats(), {**stats, 'rejected': stats['rejected'] + 1})
+
+    def test_slots_are_released(self):
+        for _ in range(self.options['MAX_CONCURRENT'] + 1):
+            with password_hashing.slot():
+                pass
+
+        self.release_slots(self.take_slots())
+
+    def test_unsafe_lock_dir_falls_back_to_process_slots(self):
+        fds = self.take_slots()
+        os.chmod(self.options['LOCK_DIR'], 0o777)
+
+        try:
+            with self.assertLogs('core.hashing', 'ERROR'):
+                res = self.login()
+        finally:
+            self.release_slots(fds)
+
+        # Slots held in a directory others can write to are ignored instead of shedding every login.
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_planted_symlink_is_not_followed(self):
+        target = os.path.join(self.options['LOCK_DIR'], 'target')
+        for i in range(self.options['MAX_CONCURRENT']):
+            os.symlink(target, os.path.join(self.options['LOCK_DIR'], f'slot-{i}'))
+
+        with self.assertLogs('core.hashing', 'ERROR'):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+        self.assertFalse(os.path.exists(target))
+
+    def test_unusable_lock_dir_does_not_fail_logins(self):
+        path = os.path.join(self.options['LOCK_DIR'], 'file')
+        open(path, 'w').close()
+
+        with override_settings(PASSWORD_HASHING={**self.options, 'LOCK_DIR': path}), self.assertLogs('core.hashing', 'ERROR'):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    @override_settings(PASSWORD_HASHERS=HASHERS)
+    def test_login_upgrades_hasher(self):
+        self.user.password = make_password('password123', hasher='md5')
+        self.user.save()
+
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    def test_login_upgrades_iterations(self):
+        hasher = PBKDF2PasswordHasher()
+        self.user.password = hasher.encode('password123', hasher.salt(), iterations=1000)
+        self.user.save()
+
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+        self.user.refresh_from_db()
+        self.assertEqual(hasher.decode(self.user.password)['iterations'], get_hasher('default').iterations)
+
+    def test_failed_login_does_not_upgrade(self):
+        hasher = PBKDF2PasswordHasher()
+        self.user.password = hasher.encode('password123', hasher.salt(), iterations=1000)
+        self.user.save()
+
+        self.login('wrong')
+
+        self.user.refresh_from_db()
+        self.assertIn('$1000$', self.user.password)
@@ -0,0 +1,112 @@
+"""
+Tests for the JSON renderer and parser
+"""
+import datetime
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.parsers import FastJSONParser, RequestTooLarge
+from core.renderers import FastJSONRenderer
+
+
+SAMPLE = OrderedDict([
+    ('id', 1),
+    ('price', Decimal('12.50')),
+    ('title', 'Crème brûlée \u2028 line \u2029 paragraph'),
+    ('lazy', gettext_lazy('Invalid cursor')),
+    ('created', datetime.datetime(2021, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)),
+    ('day', datetime.date(2021, 5, 1)),
+    ('uuid', uuid.UUID('12345678-1234-5678-1234-567812345678')),
+    ('tags', [{'id': 2, 'name': 'vegan'}, {'id': 3, 'name': None}]),
+    ('ratio', 0.25),
+    ('huge', 2 ** 70),
+])
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    def test_same_bytes_as_drf(self):
+        self.assertEqual(FastJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE))
+
+    def test_indented_output_falls_back(self):
+        renderer = FastJSONRenderer()
+
+        self.assertEqual(
+            renderer.render(SAMPLE, 'application/json; indent=4'),
+            JSONRenderer().render(SAMPLE, 'application/json; indent=4'),
+        )
+
+    def test_without_orjson(self):
+        with patch('core.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE))
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class FastJSONParserTest(SimpleTestCase):
+    def parse(self, body, parser=None, **context):
+        return (parser or FastJSONParser()).parse(BytesIO(body), 'application/json', context)
+
+    def test_parse(self):
+        self.assertEqual(self.parse('{"name": "Crème", "price": 1.5, "tags": [1, 2]}'.encode()), {'name': 'Crème', 'price': 1.5, 'tags': [1, 2]})
+
+    def test_parse_other_encoding(self):
+        self.assertEqual(self.parse('{"name": "Crème"}'.encode('latin-1'), encoding='latin-1'), {'name': 'Crème'})
+
+    def test_invalid_json(self):
+        for body in (b'', b'{"name": ', b'{"price": NaN}', b'\xff'):
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                self.parse(body)
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=10)
+    def test_body_size_limit(self):
+        self.assertEqual(self.parse(b'[1, 2, 3]'), [1, 2, 3])
+
+        with self.assertRaises(RequestTooLarge):
+            self.parse(b'[1, 2, 3, 4, 5]')
+
+    def test_parser_size_limit_overrides_setting(self):
+        parser = FastJSONParser()
+        parser.max_body_size = 4
+
+        with self.assertRaises(RequestTooLarge):
+            self.parse(b'[1, 2]', parser)
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=None)
+    def test_no_limit(self):
+        self.assertEqual(len(self.parse(b'[' + b'1,' * 10000 + b'1]')), 10001)
+
+
+class JSONApiTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_oversized_request_rejected(self):
+        payload = {'title': 'x' * 200, 'time_in_minutes': 5, 'price': '1.00'}
+
+        res = self.client.post(reverse('recipe:recipe-list'), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_token_endpoint_uses_json_parser(self):
+        res = self.client.post(reverse('user:token'), {'email': 'user@example.com', 'password': 'password123'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', res.json())
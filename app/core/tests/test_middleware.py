@@ -0,0 +1,204 @@
+"""
+Tests for response compression
+"""
+import gzip
+import zlib
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import middleware
+from core.middleware import CompressionMiddleware, choose_encoding
+from core.models import Recipe
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+BODY = b'{"title": "Some recipe title"}' * 100
+
+
+def json_response(body=BODY):
+    return HttpResponse(body, content_type='application/json')
+
+
+def compress_response(response, accept_encoding='gzip', path='/api/recipe/recipes/'):
+    request = RequestFactory().get(path, HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+class ChooseEncodingTest(SimpleTestCase):
+    def test_prefers_earlier_available_encoding_on_ties(self):
+        self.assertEqual(choose_encoding('gzip, br', ('br', 'gzip')), 'br')
+
+    def test_honours_quality_values(self):
+        self.assertEqual(choose_encoding('br;q=0.5, gzip', ('br', 'gzip')), 'gzip')
+        self.assertIsNone(choose_encoding('gzip;q=0', ('br', 'gzip')))
+
+    def test_wildcard(self):
+        self.assertEqual(choose_encoding('*', ('gzip',)), 'gzip')
+        self.assertIsNone(choose_encoding('identity', ('br', 'gzip')))
+
+
+@patch.object(middleware, 'available_encodings', lambda: ('gzip',))
+class CompressionMiddlewareTest(SimpleTestCase):
+    def test_gzip(self):
+        res = compress_response(json_response())
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(res['Content-Length']), len(res.content))
+        self.assertEqual(gzip.decompress(res.content), BODY)
+
+    def test_not_accepted(self):
+        res = compress_response(json_response(), accept_encoding='')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+        self.assertEqual(res.content, BODY)
+
+    @override_settings(RESPONSE_COMPRESSION={'MIN_SIZE': 10000})
+    def test_below_threshold(self):
+        response = json_response()
+        response['ETag'] = '"abc"'
+
+        res = compress_response(response)
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+        self.assertEqual(res['ETag'], 'W/"abc"')
+
+    def test_incompressible_type(self):
+        res = compress_response(HttpResponse(BODY, content_type='image/png'))
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_html_is_not_compressed(self):
+        res = compress_response(HttpResponse(BODY, content_type='text/html; charset=utf-8'))
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertFalse(res.has_header('Vary'))
+
+    def test_outside_api_paths(self):
+        res = compress_response(json_response(), path='/admin/')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertFalse(res.has_header('Vary'))
+
+    def test_not_modified_matches_compressed_response(self):
+        response = HttpResponseNotModified()
+        response['ETag'] = '"abc"'
+
+        res = compress_response(response)
+
+        self.assertEqual(res['ETag'], 'W/"abc"')
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+
+    @override_settings(RESPONSE_COMPRESSION={'GZIP_LEVEL': 1})
+    def test_level(self):
+        res = compress_response(json_response())
+
+        self.assertEqual(res.content, gzip.compress(BODY, compresslevel=1, mtime=0))
+
+    def test_etag_weakened(self):
+        response = json_response()
+        response['ETag'] = '"abc"'
+
+        self.assertEqual(compress_response(response)['ETag'], 'W/"abc"')
+
+    def test_streaming(self):
+        chunks = [BODY[i:i + 100] for i in range(0, len(BODY), 100)]
+        response = StreamingHttpResponse(iter(chunks), content_type='application/x-ndjson')
+        response['Content-Length'] = str(len(BODY))
+
+        res = compress_response(response)
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertFalse(res.has_header('Content-Length'))
+        self.assertEqual(zlib.decompress(b''.join(res.streaming_content), 16 + zlib.MAX_WBITS), BODY)
+
+    def test_reuses_and_stores_variants(self):
+        stored = {}
+        response = json_response()
+        response.compressed_variants = {}
+        response.store_compressed = stored.__setitem__
+
+        compress_response(response)
+        self.assertEqual(gzip.decompress(stored['gzip']), BODY)
+
+        response = json_response()
+        response.compressed_variants = {'gzip': b'precompressed'}
+        response.store_compressed = stored.__setitem__
+
+        self.assertEqual(compress_response(response).content, b'precompressed')
+
+
+@skipIf(middleware.brotli is None, 'brotli is not installed')
+class BrotliCompressionTest(SimpleTestCase):
+    def test_brotli(self):
+        res = compress_response(json_response(), accept_encoding='gzip, br')
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(middleware.brotli.decompress(res.content), BODY)
+
+    def test_brotli_streaming(self):
+        res = compress_response(StreamingHttpResponse(iter([BODY, BODY]), content_type='application/x-ndjson'), accept_encoding='br')
+
+        self.assertEqual(middleware.brotli.decompress(b''.join(res.streaming_content)), BODY * 2)
+
+
+@patch.object(middleware, 'available_encodings', lambda: ('gzip',))
+class CompressedApiTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+        Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'Recipe {i}', time_in_minutes=5, price=Decimal('12.5'), description='Some description')
+            for i in range(50)
+        ])
+        caches['responses'].clear()
+
+    def test_cache_hits_reuse_compressed_body(self):
+        with patch.object(middleware.gzip, 'compress', wraps=gzip.compress) as compress:
+            first = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip')
+            second = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(compress.call_count, 1)
+
+    def test_conditional_get_with_weak_etag(self):
+        res = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(res['ETag'].startswith('W/"'))
+
+        not_modified = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified['ETag'], res['ETag'])
+        self.assertEqual(not_modified['Vary'], res['Vary'])
+
+    def test_identity_response_unchanged(self):
+        plain = self.client.get(RECIPE_URL)
+        compressed = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+
+    def test_export_is_compressed_while_streaming(self):
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn(b'Recipe 49', zlib.decompress(b''.join(res.streaming_content), 16 + zlib.MAX_WBITS))
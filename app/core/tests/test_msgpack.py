@@ -0,0 +1,127 @@
+"""
+Tests for MessagePack content negotiation
+"""
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+
+import msgpack
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.parsers import MessagePackParser
+from core.renderers import MessagePackRenderer
+
+
+MSGPACK = 'application/msgpack'
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class MessagePackRendererParserTest(SimpleTestCase):
+    def test_round_trip(self):
+        data = {'price': Decimal('12.50'), 'tags': [{'id': 1, 'name': 'Crème'}], 'image': 'http://testserver/static/media/a.jpg', 'link': None}
+
+        parsed = MessagePackParser().parse(BytesIO(MessagePackRenderer().render(data)))
+
+        self.assertEqual(parsed, {**data, 'price': '12.50'})
+        self.assertEqual(Decimal(parsed['price']), data['price'])
+
+    def test_invalid_body(self):
+        for body in (b'', b'\xc1', msgpack.packb({'a': 1}) + b'\x01'):
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                MessagePackParser().parse(BytesIO(body))
+
+
+class MessagePackApiTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123', name='User')
+        self.client.force_authenticate(self.user)
+
+    def post(self, url, data, method='post'):
+        return getattr(self.client, method)(url, msgpack.packb(data), content_type=MSGPACK, HTTP_ACCEPT=MSGPACK)
+
+    def test_recipe_list_matches_json(self):
+        recipe = Recipe.objects.create(user=self.user, title='Soup', time_in_minutes=5, price=Decimal('12.50'), image='uploads/recipe/soup.jpg')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='vegan'))
+
+        res = self.client.get(RECIPE_URL, HTTP_ACCEPT=MSGPACK)
+        detail = self.client.get(reverse('recipe:recipe-detail', args=(recipe.id,)), HTTP_ACCEPT=MSGPACK)
+
+        self.assertEqual(res['Content-Type'], MSGPACK)
+        self.assertEqual(msgpack.unpackb(res.content), self.client.get(RECIPE_URL).json())
+        self.assertEqual(msgpack.unpackb(detail.content)['price'], '12.50')
+        self.assertEqual(msgpack.unpackb(detail.content)['image'], 'http://testserver/static/media/uploads/recipe/soup.jpg')
+
+    def test_format_query_parameter(self):
+        res = self.client.get(reverse('recipe:tag-list'), {'format': 'msgpack'})
+
+        self.assertEqual(res['Content-Type'], MSGPACK)
+        self.assertEqual(msgpack.unpackb(res.content), [])
+
+    def test_create_and_update_recipe(self):
+        res = self.post(RECIPE_URL, {'title': 'Soup', 'time_in_minutes': 5, 'price': '12.50', 'tags': [{'name': 'vegan'}]})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(msgpack.unpackb(res.content)['price'], '12.50')
+        recipe = Recipe.objects.get(id=msgpack.unpackb(res.content)['id'])
+        self.assertEqual(recipe.price, Decimal('12.50'))
+
+        res = self.post(reverse('recipe:recipe-detail', args=(recipe.id,)), {'price': '7.25'}, method='patch')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.price, Decimal('7.25'))
+
+    def test_bulk_import(self):
+        res = self.post(reverse('recipe:recipe-bulk'), [{'title': 'Soup', 'time_in_minutes': 5, 'price': '1.00'}])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(msgpack.unpackb(res.content)['created']), 1)
+
+    def test_upload_image_response(self):
+        recipe = Recipe.objects.create(user=self.user, title='Soup', time_in_minutes=5, price=Decimal('1.00'))
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            res = self.client.post(reverse('recipe:recipe-upload-image', args=(recipe.id,)), {'image': image_file}, format='multipart', HTTP_ACCEPT=MSGPACK)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(msgpack.unpackb(res.content)['image'], f'http://testserver{recipe.image.url}')
+        recipe.image.delete()
+
+    def test_user_endpoints(self):
+        res = self.post(reverse('user:me'), {'name': 'New name'}, method='patch')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(msgpack.unpackb(res.content)['name'], 'New name')
+
+        res = self.post(reverse('user:token'), {'email': 'user@example.com', 'password': 'password123'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', msgpack.unpackb(res.content))
+
+        res = self.post(reverse('user:create'), {'email': 'new@example.com', 'password': 'password123', 'name': 'New'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_errors_are_rendered(self):
+        res = self.post(RECIPE_URL, {'title': 'Soup'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('price', msgpack.unpackb(res.content))
+
+    def test_schema_advertises_msgpack(self):
+        res = self.client.get(reverse('api-schema'))
+
+        self.assertIn(MSGPACK, res.content.decode())
@@ -0,0 +1,176 @@
+"""
+Stateless signed access and refresh tokens
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+
+DEFAULTS = {
+    'ACCESS_TTL': 300,
+    'REFRESH_TTL': 14 * 24 * 3600,
+    'REVOCATION_REFRESH': 10,
+    'REVOCATION_OVERLAP': 60,
+    'BACKGROUND_REFRESH': True,
+}
+
+ACCESS_SALT = 'core.tokens.access'
+REFRESH_SALT = 'core.tokens.refresh'
+
+# Version of users that cannot use any signed token.
+REVOKED = float('inf')
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def signed_token_options():
+    return {**DEFAULTS, **getattr(settings, 'SIGNED_TOKENS', {})}
+
+
+def issue_tokens(user):
+    """Return an access and a refresh token for `user`, both bound to their current token version."""
+    payload = [user.pk, user.token_version]
+
+    return {
+        'access': signing.dumps(payload, salt=ACCESS_SALT),
+        'refresh': signing.dumps(payload, salt=REFRESH_SALT),
+    }
+
+
+def _load(token, salt, max_age):
+    try:
+        user_id, version = signing.loads(token, salt=salt, max_age=max_age)
+    except (signing.BadSignature, TypeError, ValueError):
+        # SignatureExpired is a BadSignature; malformed payloads fail the unpacking.
+        raise InvalidToken()
+
+    return user_id, version
+
+
+def verify_access_token(token):
+    """Return the user id of a valid, unexpired and unrevoked access token without querying the database."""
+    user_id, version = _load(token, ACCESS_SALT, signed_token_options()['ACCESS_TTL'])
+
+    if version < token_versions.get(user_id):
+        raise InvalidToken()
+
+    return user_id
+
+
+def refresh_access_token(token):
+    """Return fresh tokens for a valid refresh token, checking its version against the database."""
+    user_id, version = _load(token, REFRESH_SALT, signed_token_options()['REFRESH_TTL'])
+    user = get_user_model().objects.filter(pk=user_id, is_active=True, token_version=version).first()
+
+    if user is None:
+        raise InvalidToken()
+
+    token_versions.set(user_id, user.token_version)
+    return issue_tokens(user)
+
+
+def revoke_tokens(user_id):
+    """Invalidate every signed token issued to the user so far."""
+    users = get_user_model().objects.filter(pk=user_id)
+    users.update(token_version=F('token_version') + 1, token_changed_at=timezone.now())
+    token_versions.set(user_id, users.values_list('token_version', flat=True).first())
+
+
+class TokenVersions:
+    """
+    In-memory map of the token version of every user whose signed tokens were revoked.
+
+    Users are only in the map once they revoked their tokens or were
+    deactivated, so it stays small. Every `REVOCATION_REFRESH` seconds a
+    background thread reads the users whose `token_changed_at` is at most
+    `REVOCATION_OVERLAP` seconds older than the previous read, through a
+    partial index, so each refresh only touches recent changes. The overlap
+    covers transactions that commit late and clock skew between hosts.
+    Revocations made by this process are applied right away. A token is
+    accepted while its version is not below the one in the map.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = None
+        self._recent = {}
+        self._loaded_at = 0
+        self._changed_since = None
+        self._refreshing = False
+
+    def load(self):
+        """Read the users changed since the previous load from the database, or all of them on the first."""
+        started, now = time.monotonic(), timezone.now()
+        with self._lock:
+            changed_since = self._changed_since
+
+        users = get_user_model().objects.filter(token_changed_at__isnull=False)
+        if changed_since is not None:
+            users = users.filter(token_changed_at__gte=changed_since)
+        changed = {pk: version if active else REVOKED for pk, version, active in users.values_list('id', 'token_version', 'is_active')}
+
+        with self._lock:
+            versions = dict(self._versions or {}) if changed_since is not None else {}
+            versions.update(changed)
+            # Local revocations made while the query ran may be missing from its snapshot.
+            self._recent = {user_id: (version, at) for user_id, (version, at) in self._recent.items() if at >= started}
+            versions.update((user_id, version) for user_id, (version, _at) in self._recent.items())
+            self._versions = versions
+            self._loaded_at = time.monotonic()
+            self._changed_since = now - timedelta(seconds=signed_token_options()['REVOCATION_OVERLAP'])
+            self._refreshing = False
+
+    def _refresh_in_background(self):
+        try:
+            self.load()
+        finally:
+            with self._lock:
+                self._refreshing = False
+            # The thread's connection would otherwise stay open for the lifetime of the process.
+            connection.close()
+
+    def _ensure_fresh(self):
+        options = signed_token_options()
+
+        with self._lock:
+            loaded = self._versions is not None
+            stale = time.monotonic() - self._loaded_at > options['REVOCATION_REFRESH']
+            start = loaded and stale and options['BACKGROUND_REFRESH'] and not self._refreshing
+            if start:
+                self._refreshing = True
+
+        if not loaded or (stale and not options['BACKGROUND_REFRESH']):
+            self.load()
+        elif start:
+            threading.Thread(target=self._refresh_in_background, name='token-versions', daemon=True).start()
+
+    def get(self, user_id):
+        self._ensure_fresh()
+
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def set(self, user_id, version):
+        with self._lock:
+            self._recent[user_id] = (version, time.monotonic())
+            if self._versions is not None:
+                self._versions[user_id] = version
+
+    def clear(self):
+        with self._lock:
+            self._versions = None
+            self._recent = {}
+            self._loaded_at = 0
+            self._changed_since = None
+
+
+token_versions = TokenVersions()
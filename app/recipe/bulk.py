@@ -0,0 +1,232 @@
+"""
+Set-based writes of many recipes at once
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from core.models import Recipe, Tag, Ingredient
+from core.search import refresh_search_vectors
+from core.signals import SEARCHED_RECIPE_FIELDS, bump_data_version_on_commit, linked_recipes_scheduled, refresh_search_vectors_on_commit
+
+
+BATCH_SIZE = 1000
+
+
+def resolve_names(model, user, names):
+    """
+    Map every name in `names` to the user's `model` row, creating the missing ones.
+
+    Costs one lookup and, when something is missing, an `INSERT ... ON CONFLICT
+    DO NOTHING` followed by a re-select. Rows a concurrent writer inserted in
+    the meantime are skipped by the insert and picked up by the re-select, so
+    parallel writers never fail on the (user, name) constraint or retry.
+    """
+    names = set(names)
+    if not names:
+        return {}
+
+    found = {obj.name: obj for obj in model.objects.filter(user=user, name__in=names)}
+    missing = sorted(names - found.keys())
+
+    if missing:
+        # A stable insert order keeps two writers from locking the same names in opposite order and deadlocking.
+        model.objects.bulk_create([model(user=user, name=name) for name in missing], ignore_conflicts=True)
+        found.update((obj.name, obj) for obj in model.objects.filter(user=user, name__in=missing))
+
+    return found
+
+
+def _insert_recipes(user, recipes):
+    Recipe.objects.bulk_create(recipes)
+
+    if not connection.features.can_return_rows_from_bulk_insert:
+        # SQLite holds the database write lock until the surrounding transaction
+        # commits, so the newest ids of the user are the rows just inserted.
+        ids = Recipe.objects.filter(user=user).order_by('-id').values_list('id', flat=True)[:len(recipes)]
+        for recipe, pk in zip(recipes, reversed(list(ids))):
+            recipe.pk = pk
+
+
+def _link(recipes, relation, objects_by_name, names_per_recipe):
+    through = getattr(Recipe, relation).through
+    column = getattr(Recipe, relation).field.m2m_reverse_name()
+    links = []
+
+    for recipe, names in zip(recipes, names_per_recipe):
+        for related_id in {objects_by_name[name].pk for name in names}:
+            links.append(through(recipe_id=recipe.pk, **{column: related_id}))
+
+    through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+
+
+def create_recipes(user, validated_items):
+    """
+    Create recipes from already validated serializer data in one transaction.
+
+    Each batch resolves its tags and ingredients with a single lookup per
+    relation and writes recipes and through rows with one insert each.
+    """
+    created = []
+
+    with transaction.atomic():
+        for start in range(0, len(validated_items), BATCH_SIZE):
+            batch = [dict(item) for item in validated_items[start:start + BATCH_SIZE]]
+            tag_names = [[tag['name'] for tag in item.pop('tags', [])] for item in batch]
+            ingredient_names = [[ingredient['name'] for ingredient in item.pop('ingredients', [])] for item in batch]
+
+            tags = resolve_names(Tag, user, (name for names in tag_names for name in names))
+            ingredients = resolve_names(Ingredient, user, (name for names in ingredient_names for name in names))
+
+            recipes = [Recipe(user=user, **item) for item in batch]
+            _insert_recipes(user, recipes)
+            _link(recipes, 'tags', tags, tag_names)
+            _link(recipes, 'ingredients', ingredients, ingredient_names)
+
+            refresh_search_vectors(Recipe.objects.filter(pk__in=[recipe.pk for recipe in recipes]))
+            created.extend(recipes)
+
+        if created:
+            bump_data_version_on_commit(user.pk)
+
+    return created
+
+
+def _chunks(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _replace_links(user, relation, model, names_by_recipe):
+    """Diff the links of every recipe in `names_by_recipe` against the wanted names with one delete and one insert."""
+    if not names_by_recipe:
+        return
+
+    through = getattr(Recipe, relation).through
+    column = getattr(Recipe, relation).field.m2m_reverse_name()
+    objects = resolve_names(model, user, (name for names in names_by_recipe.values() for name in names))
+    wanted = {recipe_id: {objects[name].pk for name in names} for recipe_id, names in names_by_recipe.items()}
+
+    stale = []
+    for recipe_ids in _chunks(wanted):
+        for link_id, recipe_id, related_id in through.objects.filter(recipe_id__in=recipe_ids).values_list('id', 'recipe_id', column):
+            if related_id in wanted[recipe_id]:
+                wanted[recipe_id].discard(related_id)
+            else:
+                stale.append(link_id)
+
+    for link_ids in _chunks(stale):
+        through.objects.filter(pk__in=link_ids).delete()
+
+    links = [through(recipe_id=recipe_id, **{column: related_id}) for recipe_id, related_ids in wanted.items() for related_id in related_ids]
+    through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+
+
+def update_recipes(user, changes):
+    """
+    Apply validated partial updates to recipes of `user` in one transaction.
+
+    `changes` is a list of `(ids, data)` pairs. Data shared by several ids is
+    written with a single `UPDATE ... WHERE id IN`, single-id changes are
+    grouped into `bulk_update` calls, and tag and ingredient lists replace
+    the current links through one diff per relation.
+    """
+    single = defaultdict(list)
+    tag_names, ingredient_names = {}, {}
+    touched = set()
+
+    with transaction.atomic():
+        for ids, data in changes:
+            data = dict(data)
+            for relation, names in (('tags', tag_names), ('ingredients', ingredient_names)):
+                if relation in data:
+                    names.update((pk, [item['name'] for item in data[relation]]) for pk in ids)
+                    touched.update(ids)
+                    del data[relation]
+
+            if not data:
+                continue
+            if len(ids) > 1:
+                for chunk in _chunks(ids):
+                    Recipe.objects.filter(user=user, pk__in=chunk).update(**data)
+            else:
+                single[tuple(sorted(data))].append(Recipe(pk=ids[0], user=user, **data))
+
+            if SEARCHED_RECIPE_FIELDS & data.keys():
+                touched.update(ids)
+
+        for fields, recipes in single.items():
+            Recipe.objects.bulk_update(recipes, fields, batch_size=BATCH_SIZE)
+
+        _replace_links(user, 'tags', Tag, tag_names)
+        _replace_links(user, 'ingredients', Ingredient, ingredient_names)
+
+        for chunk in _chunks(touched):
+            refresh_search_vectors(Recipe.objects.filter(pk__in=chunk))
+
+        if changes:
+            bump_data_version_on_commit(user.pk)
+
+
+def delete_recipes(user, ids):
+    """Delete the recipes of `user` with `ids` and their links and return how many were deleted."""
+    deleted = 0
+
+    with transaction.atomic():
+        for chunk in _chunks(ids):
+            # The collector deletes the links with one statement per relation; the
+            # post_delete receivers only schedule the data version bump for the commit.
+            _total, per_model = Recipe.objects.filter(user=user, pk__in=chunk).delete()
+            deleted += per_model.get(Recipe._meta.label, 0)
+
+    return deleted
+
+
+def merge_names(user, model, relation, target_id, source_ids, name=None):
+    """
+    Fold the `source_ids` rows of `model` into `target_id` and optionally rename it.
+
+    The links of each chunk of sources are copied to the target with a single
+    `INSERT ... SELECT` that skips recipes already linked to it, then the
+    sources are deleted together with their links, so the number of queries
+    grows with the number of chunks only. Returns the ids of the
+    recipes whose links changed.
+    """
+    through = getattr(Recipe, relation).through
+    attname = getattr(Recipe, relation).field.m2m_reverse_name()
+    quote = connection.ops.quote_name
+    table, recipe_column, column = quote(through._meta.db_table), quote(through._meta.get_field('recipe').column), quote(attname)
+    source_ids = sorted(set(source_ids) - {target_id})
+
+    with transaction.atomic():
+        # Lock in id order so a concurrent merge or link write waits instead of deadlocking.
+        list(model.objects.select_for_update().filter(user=user, pk__in=[target_id, *source_ids]).order_by('pk').values_list('id'))
+        affected = set()
+
+        for chunk in _chunks(source_ids, 500):
+            affected.update(through.objects.filter(**{f'{attname}__in': chunk}).values_list('recipe_id', flat=True))
+
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'{connection.ops.insert_statement(ignore_conflicts=True)} {table} ({recipe_column}, {column}) '
+                    f'SELECT DISTINCT {recipe_column}, %s FROM {table} WHERE {column} IN ({", ".join(["%s"] * len(chunk))}) '
+                    f'{connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+                    [target_id, *chunk],
+                )
+
+            # The collector removes the source links with one statement; the linked
+            # recipes are already in `affected`, so the receivers skip their lookup.
+            with linked_recipes_scheduled():
+                model.objects.filter(user=user, pk__in=chunk).delete()
+
+        if name is not None:
+            model.objects.filter(user=user, pk=target_id).update(name=name)
+            affected.update(through.objects.filter(**{attname: target_id}).values_list('recipe_id', flat=True))
+
+        refresh_search_vectors_on_commit(affected)
+
+        if source_ids or name is not None:
+            bump_data_version_on_commit(user.pk)
+
+    return affected
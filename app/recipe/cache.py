@@ -0,0 +1,186 @@
+"""
+Per-user cache of rendered read responses
+"""
+import hashlib
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .mixins import EarlyResponse, EarlyResponseMixin
+
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+    'MAX_ENTRY_SIZE': 64 * 1024,
+    'MAX_KEYS_PER_USER': 256,
+}
+
+ID_LIST_PARAMS = ('tags', 'ingredients')
+
+
+class ResponseCache:
+    """
+    Stores rendered responses keyed on the user, their data version, the view
+    action, the serializer variant and the normalised query parameters.
+
+    The data version in the key keeps entries correct across processes. The
+    keys of each user are also tracked with their expiry time so writes drop
+    them eagerly instead of leaving them to expire, and a miss on a tracked
+    key that has not expired yet is counted as an eviction by the backend. An
+    entry, compressed variants included, never
+    holds more than `MAX_ENTRY_SIZE` bytes of bodies, which bounds the cache
+    by its `MAX_ENTRIES` times that.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def options(self):
+        return {**DEFAULTS, **getattr(settings, 'RECIPE_RESPONSE_CACHE', {})}
+
+    @property
+    def cache(self):
+        return caches[self.options['CACHE_ALIAS']]
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'oversized': 0, 'evictions': 0, 'invalidations': 0, 'variants': 0}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _registry_key(self, user_id):
+        return f'recipe-response-registry:{user_id}'
+
+    def normalise_params(self, query_params):
+        params = []
+
+        for name in sorted(query_params):
+            value = query_params.get(name)
+
+            if name in ID_LIST_PARAMS:
+                try:
+                    value = ','.join(str(pk) for pk in sorted({int(pk) for pk in value.split(',') if pk}))
+                except ValueError:
+                    pass
+
+            params.append(f'{name}={value}')
+
+        return '&'.join(params)
+
+    def make_key(self, request, view):
+        user = request.user
+        variant = ':'.join((
+            view.basename,
+            view.action,
+            str(view.kwargs.get(view.lookup_url_kwarg or view.lookup_field, '')),
+            view.get_serializer_class().__name__,
+            request.accepted_media_type,
+            request.build_absolute_uri('/'),
+            self.normalise_params(request.query_params),
+        ))
+
+        return f'recipe-response:{user.pk}:{user.data_version}:{hashlib.sha1(variant.encode("utf-8")).hexdigest()}'
+
+    def get(self, user_id, key):
+        entry = self.cache.get(key)
+        if entry is not None:
+            self._count('hits')
+            return entry
+
+        self._count('misses')
+        if self.cache.get(self._registry_key(user_id), {}).get(key, 0) > time.time():
+            self._count('evictions')
+
+        return None
+
+    def set(self, user_id, key, content, content_type):
+        options = self.options
+
+        if len(content) > options['MAX_ENTRY_SIZE']:
+            self._count('oversized')
+            return
+
+        self.cache.set(key, {'content': content, 'content_type': content_type, 'encoded': {}}, options['TIMEOUT'])
+
+        registry_key = self._registry_key(user_id)
+        keys = self.cache.get(registry_key, {})
+        keys.pop(key, None)
+        keys[key] = time.time() + options['TIMEOUT']
+        self.cache.set(registry_key, dict(list(keys.items())[-options['MAX_KEYS_PER_USER']:]), options['TIMEOUT'])
+        self._count('stores')
+
+    def set_variant(self, key, encoding, body):
+        """Keep the `encoding` compressed body of an entry so later hits skip compressing it."""
+        entry = self.cache.get(key)
+        if entry is None:
+            return
+
+        encoded = entry.setdefault('encoded', {})
+        if len(entry['content']) + sum(map(len, encoded.values())) + len(body) > self.options['MAX_ENTRY_SIZE']:
+            self._count('oversized')
+            return
+
+        encoded[encoding] = body
+        self.cache.set(key, entry, self.options['TIMEOUT'])
+        self._count('variants')
+
+    def invalidate(self, user_id):
+        registry_key = self._registry_key(user_id)
+        keys = self.cache.get(registry_key)
+
+        if keys:
+            self.cache.delete_many([*keys, registry_key])
+            self._count('invalidations', len(keys))
+
+
+response_cache = ResponseCache()
+
+
+class CachedResponseMixin(EarlyResponseMixin):
+    """Serve read actions from `response_cache` and store freshly rendered ones in it."""
+    cache_actions = ('list', 'retrieve')
+
+    def is_cacheable(self, request):
+        return self.action in self.cache_actions and request.method in ('GET', 'HEAD')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        if self.is_cacheable(request):
+            self.response_cache_key = response_cache.make_key(request, self)
+            entry = response_cache.get(request.user.pk, self.response_cache_key)
+
+            if entry is not None:
+                response = HttpResponse(entry['content'], content_type=entry['content_type'])
+                response['X-Cache'] = 'HIT'
+                self.attach_compressed_variants(response, entry.get('encoded'))
+                raise EarlyResponse(response)
+
+    def attach_compressed_variants(self, response, variants=None):
+        """Let the compression middleware reuse and keep compressed bodies of the cached entry."""
+        response.compressed_variants = variants or {}
+        response.store_compressed = partial(response_cache.set_variant, self.response_cache_key)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        if getattr(self, 'response_cache_key', None) and response.status_code == 200 and not response.has_header('X-Cache'):
+            response.render()
+            response_cache.set(request.user.pk, self.response_cache_key, response.content, response['Content-Type'])
+            response['X-Cache'] = 'MISS'
+            self.attach_compressed_variants(response)
+
+        return response
@@ -0,0 +1,75 @@
+"""
+Streaming export of recipes
+"""
+import csv
+import json
+
+from django.core.files.storage import default_storage
+
+from core.models import Recipe
+
+
+EXPORT_FIELDS = ('id', 'title', 'time_in_minutes', 'price', 'link', 'description', 'image')
+CSV_FIELDS = EXPORT_FIELDS + ('tags', 'ingredients')
+RELATIONS = (('tags', Recipe.tags.through, 'tag'), ('ingredients', Recipe.ingredients.through, 'ingredient'))
+
+
+def _attach_links(chunk):
+    """Load the tags and ingredients of a chunk of recipe rows with one query per relation."""
+    rows = {row['id']: row for row in chunk}
+
+    for row in chunk:
+        for relation, _through, _column in RELATIONS:
+            row[relation] = []
+
+    for relation, through, column in RELATIONS:
+        links = through.objects.filter(recipe_id__in=list(rows)).order_by(f'{column}_id').values_list('recipe_id', f'{column}_id', f'{column}__name')
+        for recipe_id, related_id, name in links:
+            rows[recipe_id][relation].append({'id': related_id, 'name': name})
+
+    return chunk
+
+
+def iter_recipes(queryset, chunk_size, build_url):
+    """
+    Yield recipe rows of `queryset` as plain dicts with their tags and ingredients.
+
+    Rows are read through a server-side cursor `chunk_size` at a time, so memory
+    use does not depend on how many recipes are exported.
+    """
+    chunk = []
+
+    for row in queryset.values(*EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        row['price'] = str(row['price'])
+        row['image'] = build_url(default_storage.url(row['image'])) if row['image'] else None
+        chunk.append(row)
+
+        if len(chunk) == chunk_size:
+            yield from _attach_links(chunk)
+            chunk = []
+
+    if chunk:
+        yield from _attach_links(chunk)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """File-like object handing written CSV lines straight back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_FIELDS)
+
+    for row in rows:
+        yield writer.writerow(
+            [row[field] for field in EXPORT_FIELDS]
+            + ['|'.join(item['name'] for item in row['tags']), '|'.join(item['name'] for item in row['ingredients'])]
+        )
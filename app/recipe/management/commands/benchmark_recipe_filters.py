@@ -0,0 +1,50 @@
+"""
+Benchmark tag filtering on the recipe list: JOIN + DISTINCT against EXISTS semi-joins
+"""
+from core.benchmark import BenchmarkCommand, create_benchmark_user, seed_recipes
+from core.models import Recipe, Tag
+from recipe.views import RecipeViewSet
+
+
+class Command(BenchmarkCommand):
+    help = 'Compare the legacy JOIN + DISTINCT tag filter with the EXISTS based one.'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--filter-tags', type=int, default=3, help='Number of tag ids passed to the filter')
+
+    def benchmark(self, recipes, tags, filter_tags, **options):
+        user = create_benchmark_user()
+        seed_recipes(user, recipes, tags=tags, tags_per_recipe=3)
+        tag_ids = set(Tag.objects.filter(user=user).order_by('id').values_list('id', flat=True)[:filter_tags])
+        view = RecipeViewSet()
+        recipes = Recipe.objects.filter(user=user).order_by('-id')
+
+        def legacy_any():
+            return list(Recipe.objects.filter(tags__id__in=tag_ids).filter(user=user).order_by('-id').distinct())
+
+        def legacy_all():
+            queryset = Recipe.objects.all()
+            for tag_id in tag_ids:
+                queryset = queryset.filter(tags__id=tag_id)
+
+            return list(queryset.filter(user=user).order_by('-id').distinct())
+
+        def exists_any():
+            return list(view._filter_by_links(recipes, Recipe.tags.through, 'tag_id', tag_ids, 'any'))
+
+        def exists_all():
+            return list(view._filter_by_links(recipes, Recipe.tags.through, 'tag_id', tag_ids, 'all'))
+
+        self.stdout.write(f'{recipes.count()} recipes, filtering by {len(tag_ids)} tags')
+
+        for match, legacy, current in (('any', legacy_any, exists_any), ('all', legacy_all, exists_all)):
+            legacy_ms, legacy_rows = self.measure(legacy)
+            current_ms, current_rows = self.measure(current)
+            assert [r.id for r in legacy_rows] == [r.id for r in current_rows], 'Filters disagree'
+
+            self.report(f'match={match} JOIN + DISTINCT', legacy_ms, rows=len(legacy_rows))
+            self.report(f'match={match} EXISTS', current_ms, rows=len(current_rows))
+            self.compare(f'match={match} speedup', legacy_ms, current_ms)
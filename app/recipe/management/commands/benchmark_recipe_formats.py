@@ -0,0 +1,41 @@
+"""
+Benchmark the wire formats on the recipe list: payload size and encode/decode time of JSON and MessagePack
+"""
+from io import BytesIO
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.benchmark import BenchmarkCommand, create_benchmark_user, seed_recipes
+from core.models import Recipe
+from core.parsers import FastJSONParser, MessagePackParser
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BenchmarkCommand):
+    help = 'Compare payload size and encode/decode time of the recipe list in JSON and MessagePack.'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--recipes', type=int, default=10000)
+
+    def benchmark(self, recipes, **options):
+        user = create_benchmark_user()
+        seed_recipes(user, recipes)
+        queryset = Recipe.objects.filter(user=user).order_by('-id')
+        serializer = RecipeSerializer(queryset, many=True, context={'request': Request(APIRequestFactory().get('/'))})
+        data = serializer.to_representation(serializer.values_queryset(queryset))
+        self.stdout.write(f'{len(data)} recipes')
+
+        sizes = {}
+        for name, renderer, parser in (('json', FastJSONRenderer(), FastJSONParser()), ('msgpack', MessagePackRenderer(), MessagePackParser())):
+            encode_ms, body = self.measure(lambda: renderer.render(data))
+            decode_ms, decoded = self.measure(lambda: parser.parse(BytesIO(body), parser_context={'encoding': 'utf-8'}))
+            assert decoded == data, f'{name} does not round-trip the recipe list'
+
+            sizes[name] = len(body)
+            self.report(f'{name} encode', encode_ms, bytes=len(body))
+            self.report(f'{name} decode', decode_ms)
+
+        self.stdout.write(self.style.SUCCESS(f'msgpack size: {sizes["msgpack"] / sizes["json"]:.0%} of json'))
@@ -0,0 +1,44 @@
+"""
+Benchmark rendering the recipe list: ModelSerializer over instances against the values() fast path
+"""
+from django.db.models import Prefetch
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.benchmark import BenchmarkCommand, create_benchmark_user, seed_recipes
+from core.models import Recipe, Tag, Ingredient
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BenchmarkCommand):
+    help = 'Compare the regular list serialization of recipes with the values() based one.'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--recipes', type=int, default=10000)
+
+    def benchmark(self, recipes, **options):
+        user = create_benchmark_user()
+        seed_recipes(user, recipes)
+        request = Request(APIRequestFactory().get('/'))
+        queryset = Recipe.objects.filter(user=user).defer('search_vector').order_by('-id')
+        renderer = JSONRenderer()
+
+        def regular():
+            instances = queryset.prefetch_related(Prefetch('tags', Tag.objects.order_by('pk')), Prefetch('ingredients', Ingredient.objects.order_by('pk')))
+            return renderer.render(RecipeSerializer(instances, many=True, context={'request': request}).data)
+
+        def values():
+            serializer = RecipeSerializer(queryset, many=True, context={'request': request})
+            return renderer.render(serializer.to_representation(serializer.values_queryset(queryset)))
+
+        regular_ms, regular_body = self.measure(regular)
+        values_ms, values_body = self.measure(values)
+        assert regular_body == values_body, 'Serializers disagree'
+
+        self.stdout.write(f'{recipes} recipes, {len(values_body)} bytes')
+        self.report('ModelSerializer', regular_ms)
+        self.report('values()', values_ms)
+        self.compare('speedup', regular_ms, values_ms)
@@ -0,0 +1,74 @@
+"""
+Benchmark PATCH-style tag updates: clear-and-re-add against diffing the current links
+"""
+import random
+
+from django.db import connection, transaction
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.benchmark import BenchmarkCommand, create_benchmark_user, seed_recipes
+from core.models import Recipe, Tag
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BenchmarkCommand):
+    help = 'Compare the write volume of clear-and-re-add tag updates with diff-based ones.'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--updates', type=int, default=500, help='Number of PATCH requests per run')
+        parser.add_argument('--changed', type=float, default=0.1, help='Share of updates that swap one tag')
+
+    def benchmark(self, recipes, updates, changed, **options):
+        user = create_benchmark_user()
+        recipe_ids = seed_recipes(user, recipes, tags_per_recipe=5, ingredients_per_recipe=0)
+        tag_names = list(Tag.objects.filter(user=user).values_list('name', flat=True))
+        request = Request(APIRequestFactory().patch('/'))
+        request.user = user
+        rng = random.Random(0)
+
+        workload = []
+        for recipe in Recipe.objects.filter(pk__in=rng.sample(recipe_ids, min(updates, len(recipe_ids)))).prefetch_related('tags'):
+            names = [tag.name for tag in recipe.tags.all()]
+            if rng.random() < changed:
+                names[0] = rng.choice(tag_names)
+            workload.append((recipe, [{'name': name} for name in names]))
+
+        def rolled_back(func):
+            # Every run has to start from the seeded links, otherwise later runs find nothing to change.
+            def run():
+                with transaction.atomic():
+                    func()
+                    transaction.set_rollback(True)
+            return run
+
+        @rolled_back
+        def clear_and_add():
+            for recipe, tags in workload:
+                recipe.tags.clear()
+                recipe.tags.add(*Tag.objects.filter(user=user, name__in=[tag['name'] for tag in tags]))
+
+        @rolled_back
+        def diff():
+            for recipe, tags in workload:
+                serializer = RecipeSerializer(recipe, data={'tags': tags}, partial=True, context={'request': request})
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+
+        self.stdout.write(f'{len(workload)} updates, {changed:.0%} of them change one tag')
+
+        for label, func in (('clear and re-add', clear_and_add), ('diff', diff)):
+            writes = []
+
+            def count_link_writes(execute, sql, params, many, context):
+                if 'core_recipe_tags' in sql and sql.startswith(('INSERT', 'DELETE')):
+                    writes.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count_link_writes):
+                ms, _result = self.measure(func)
+
+            self.report(label, ms, link_writes=len(writes) // self.repeat)
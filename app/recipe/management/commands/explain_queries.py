@@ -0,0 +1,117 @@
+"""
+Run EXPLAIN on the queries behind every recipe endpoint and report sequential scans and sorts
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.pagination import KeysetPagination
+from recipe.suggest import suggestion_queryset
+from recipe.views import RecipeViewSet, TagViewSet, IngredientView
+
+
+PLAN_ISSUES = {
+    'postgresql': (
+        ('sequential scan', re.compile(r'Seq Scan on (\w+)')),
+        ('sort', re.compile(r'->\s+(?:Incremental )?Sort\b|^(?:Incremental )?Sort\b')),
+    ),
+    'sqlite': (
+        ('sequential scan', re.compile(r'\bSCAN (?:TABLE )?(\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)')),
+        ('sort', re.compile(r'USE TEMP B-TREE FOR (?:ORDER BY|DISTINCT|GROUP BY)')),
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the query of each recipe endpoint and report sequential scans and sorts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Explain the queries as this user (defaults to the first user)')
+        parser.add_argument('--allow-seqscan', action='store_true', help='Do not discourage sequential scans on PostgreSQL')
+        parser.add_argument('--strict', action='store_true', help='Exit with an error when any query has an issue')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['email'])
+        issues = 0
+
+        with transaction.atomic():
+            if connection.vendor == 'postgresql' and not options['allow_seqscan']:
+                # Small development tables make the planner prefer seq scans; ask whether an index path exists instead.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset in self.get_querysets(user):
+                found = self.find_issues(queryset.explain())
+                issues += len(found)
+
+                if found:
+                    self.stdout.write(self.style.WARNING(f'{name}: ' + ', '.join(found)))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'{name}: OK'))
+
+        if issues and options['strict']:
+            raise CommandError(f'{issues} plan issue(s) found')
+
+    def get_user(self, email):
+        users = get_user_model().objects.order_by('id')
+        user = users.filter(email=email).first() if email else users.first()
+
+        if user is None:
+            raise CommandError('No user to explain the queries for')
+
+        return user
+
+    def view_queryset(self, viewset, action, user, params=None, **kwargs):
+        request = Request(APIRequestFactory().get('/', params or {}))
+        request.user = user
+
+        return viewset(action=action, request=request, format_kwarg=None, kwargs=kwargs).get_queryset()
+
+    def next_page(self, queryset, last):
+        """Apply the keyset filter the paginator uses for the page after `last`."""
+        paginator = KeysetPagination()
+        paginator.ordering = paginator.get_ordering(queryset)
+        position = [getattr(last, field.lstrip('-')) for field in paginator.ordering]
+
+        return queryset.filter(paginator.get_position_filter(position))[:paginator.page_size]
+
+    def get_querysets(self, user):
+        tag_ids = ','.join(str(pk) for pk in Tag.objects.filter(user=user).values_list('id', flat=True)[:3]) or '0'
+        ingredient_ids = ','.join(str(pk) for pk in Ingredient.objects.filter(user=user).values_list('id', flat=True)[:3]) or '0'
+        recipe_ids = list(Recipe.objects.filter(user=user).values_list('id', flat=True)[:50]) or [0]
+
+        return (
+            ('recipe list', self.view_queryset(RecipeViewSet, 'list', user)[:50]),
+            ('recipe list next page', self.next_page(self.view_queryset(RecipeViewSet, 'list', user), Recipe(id=recipe_ids[0]))),
+            ('recipe list tags=any', self.view_queryset(RecipeViewSet, 'list', user, {'tags': tag_ids})[:50]),
+            ('recipe list tags=all', self.view_queryset(RecipeViewSet, 'list', user, {'tags': tag_ids, 'match': 'all'})[:50]),
+            ('recipe list ingredients=any', self.view_queryset(RecipeViewSet, 'list', user, {'ingredients': ingredient_ids})[:50]),
+            ('recipe list search', self.view_queryset(RecipeViewSet, 'list', user, {'search': 'recipe'})[:50]),
+            ('recipe detail', self.view_queryset(RecipeViewSet, 'retrieve', user).filter(pk=recipe_ids[0])),
+            ('recipe tags prefetch', Tag.objects.filter(recipe__in=recipe_ids)),
+            ('recipe ingredients prefetch', Ingredient.objects.filter(recipe__in=recipe_ids)),
+            ('tag list', self.view_queryset(TagViewSet, 'list', user)[:50]),
+            ('tag list next page', self.next_page(self.view_queryset(TagViewSet, 'list', user), Tag(id=0, name='tag'))),
+            ('tag list assigned_only', self.view_queryset(TagViewSet, 'list', user, {'assigned_only': 1})[:50]),
+            ('tag list with_counts', self.view_queryset(TagViewSet, 'list', user, {'with_counts': 1, 'ordering': '-usage'})[:50]),
+            ('tag suggest', suggestion_queryset(Tag.objects.filter(user=user), 'ta')[:10]),
+            ('ingredient list', self.view_queryset(IngredientView, 'list', user)[:50]),
+            ('ingredient list assigned_only', self.view_queryset(IngredientView, 'list', user, {'assigned_only': 1})[:50]),
+        )
+
+    def find_issues(self, plan):
+        found = []
+
+        for label, pattern in PLAN_ISSUES.get(connection.vendor, ()):
+            for line in plan.splitlines():
+                match = pattern.search(line.strip())
+                if match:
+                    found.append(f'{label} ({match.group(1) if match.groups() else match.group(0)})')
+
+        return found
@@ -0,0 +1,177 @@
+import hashlib
+
+from django.db.models import Prefetch
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter('fields', OpenApiTypes.STR, description='Comma separated list of fields to return (fields=id,title)'),
+    OpenApiParameter('exclude', OpenApiTypes.STR, description='Comma separated list of fields to leave out (exclude=tags,ingredients)'),
+]
+
+
+class SparseFieldsetMixin:
+    """
+    Support `?fields=` / `?exclude=` on read actions.
+
+    Unrequested fields are dropped from the serializer, unrequested columns are
+    deferred in SQL and relations listed in `sparse_prefetch` are only
+    prefetched when they are rendered.
+    """
+    sparse_actions = ('list', 'retrieve')
+    sparse_prefetch = ()
+
+    def _parse_field_list(self, param):
+        value = self.request.query_params.get(param)
+        return None if value is None else [name.strip() for name in value.split(',') if name.strip()]
+
+    def get_available_fields(self):
+        """Names of the fields the serializer renders for this request when the client does not restrict them."""
+        if not hasattr(self, '_available_fields'):
+            serializer = self.get_serializer_class()(context=self.get_serializer_context())
+            self._available_fields = [name for name, field in serializer.fields.items() if not field.write_only]
+
+        return self._available_fields
+
+    def get_sparse_fieldset(self):
+        """Return the `(fields, exclude)` requested by the client, or `None` when all fields are wanted."""
+        if self.action not in self.sparse_actions:
+            return None
+
+        fields, exclude = self._parse_field_list('fields'), self._parse_field_list('exclude')
+        if fields is None and not exclude:
+            return None
+
+        if fields == []:
+            raise ValidationError({'fields': 'Name at least one field.'})
+
+        available = self.get_available_fields()
+        unknown = set(fields or ()) - set(available) | set(exclude or ()) - set(available)
+        if unknown:
+            raise ValidationError({'fields': f'Unknown field(s): {", ".join(sorted(unknown))}'})
+
+        if not self._select_fields(available, fields, exclude):
+            raise ValidationError({'fields': 'No fields left to render.'})
+
+        return fields, exclude
+
+    def _select_fields(self, available, fields, exclude):
+        return [name for name in available if (fields is None or name in fields) and name not in (exclude or ())]
+
+    def get_rendered_fields(self):
+        """Names of the serializer fields the response will contain."""
+        fieldset = self.get_sparse_fieldset()
+
+        if fieldset is None:
+            return self.get_available_fields()
+
+        return self._select_fields(self.get_available_fields(), *fieldset)
+
+    def apply_sparse_fieldset(self, queryset):
+        if self.action not in self.sparse_actions:
+            return queryset
+
+        rendered = self.get_rendered_fields()
+
+        if self.get_sparse_fieldset() is not None:
+            model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+            ordering = {name.lstrip('-') for name in queryset.query.order_by if isinstance(name, str)}
+            columns = ({queryset.model._meta.pk.name} | set(rendered) | ordering) & model_fields
+            queryset = queryset.only(*columns)
+
+        # Related rows are ordered by primary key so nested lists render in a stable order.
+        prefetch = [
+            Prefetch(name, queryset=queryset.model._meta.get_field(name).related_model.objects.order_by('pk'))
+            for name in self.sparse_prefetch if name in rendered
+        ]
+        return queryset.prefetch_related(*prefetch) if prefetch else queryset
+
+    def get_serializer(self, *args, **kwargs):
+        fieldset = self.get_sparse_fieldset()
+
+        if fieldset is not None:
+            kwargs['fields'], kwargs['exclude'] = fieldset
+
+        return super().get_serializer(*args, **kwargs)
+
+
+class ValuesListMixin:
+    """
+    Serve `list` from `values()` rows when the list serializer can render them.
+
+    Skips building model instances and prefetching relations; the serializer
+    loads nested relations itself. Falls back to the regular path otherwise.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer(queryset, many=True)
+        values = serializer.values_queryset(queryset) if hasattr(serializer, 'values_queryset') else None
+
+        if values is None:
+            return super().list(request, *args, **kwargs)
+
+        page = self.paginate_queryset(values)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+        return Response(self.get_serializer(values, many=True).data)
+
+
+class EarlyResponse(Exception):
+    """Raised from `initial()` to answer a request without running the handler."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class EarlyResponseMixin:
+    def handle_exception(self, exc):
+        if isinstance(exc, EarlyResponse):
+            return exc.response
+
+        return super().handle_exception(exc)
+
+
+class ConditionalGetMixin(EarlyResponseMixin):
+    """
+    Answer `If-None-Match` on read actions without querying the data.
+
+    The ETag is derived from the user's data version, which every write to
+    their recipes, tags, ingredients or links bumps, so checking it only needs
+    the already authenticated user. No `Last-Modified` is sent: with whole
+    second precision a write in the same second as a read would leave the
+    older copy valid.
+    """
+    conditional_actions = ('list', 'retrieve')
+
+    def is_conditional(self, request):
+        return self.action in self.conditional_actions and request.method in ('GET', 'HEAD')
+
+    def get_etag(self, request):
+        user = request.user
+        key = f'{user.pk}:{user.data_version}:{request.accepted_media_type}:{request.get_full_path()}'
+
+        return '"%s"' % hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        if self.is_conditional(request):
+            response = get_conditional_response(request, etag=self.get_etag(request))
+            if response is not None:
+                raise EarlyResponse(response)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        if self.is_conditional(request) and response.status_code in (200, 304):
+            response['ETag'] = self.get_etag(request)
+            patch_vary_headers(response, ('Accept', 'Authorization'))
+
+        return response
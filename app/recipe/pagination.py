@@ -0,0 +1,166 @@
+import base64
+import json
+import math
+from collections import OrderedDict
+from functools import partial, reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in cursor pagination keyed on the queryset ordering.
+
+    Paginates only when the client sends `page_size` or `cursor`. The cursor
+    holds the ordering values of the last row of the previous page, so every
+    page is a `WHERE (key) < (last key) ... LIMIT n` range scan on the matching
+    index and never uses OFFSET. The last ordering field must be unique.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 500
+    # Numbers outside a signed 64-bit integer cannot be bound as query parameters.
+    max_position_value = 2 ** 63 - 1
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params and self.page_size_query_param not in request.query_params:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.get_position_filter(position))
+            except (TypeError, ValueError, ValidationError):
+                # Values the ordering fields cannot convert, such as a string for an id.
+                raise NotFound(self.invalid_cursor_message)
+
+        try:
+            results = list(queryset[:self.page_size + 1])
+        except OverflowError:
+            # A numeric string the id field converted to an integer the database cannot bind.
+            raise NotFound(self.invalid_cursor_message)
+
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        return self.page
+
+    def get_ordering(self, queryset):
+        ordering = tuple(queryset.query.order_by)
+        assert ordering and all(isinstance(field, str) for field in ordering), (
+            'KeysetPagination requires a queryset ordered by field names, the last of which is unique.'
+        )
+
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_position_filter(self, position):
+        """Build `(f1, f2, ...) < (v1, v2, ...)` honouring each field direction."""
+        fields = [(field.lstrip('-'), 'lt' if field.startswith('-') else 'gt') for field in self.ordering]
+        branches = []
+
+        for i, (name, lookup) in enumerate(fields):
+            branch = {prev: position[j] for j, (prev, _lookup) in enumerate(fields[:i])}
+            branch[f'{name}__{lookup}'] = position[i]
+            branches.append(Q(**branch))
+
+        # Bound the leading column too so the planner can turn the page into an index range scan.
+        name, lookup = fields[0]
+        return Q(**{f'{name}__{lookup}e': position[0]}) & reduce(or_, branches)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not all(self.is_valid_position_value(value) for value in position):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position
+
+    def is_valid_position_value(self, value):
+        if isinstance(value, str):
+            return True
+
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return False
+
+        return math.isfinite(value) and abs(value) <= self.max_position_value
+
+    def encode_cursor(self, row):
+        """Point after `row`, a model instance or a `values()` dict."""
+        read = row.__getitem__ if isinstance(row, dict) else partial(getattr, row)
+        position = [read(field.lstrip('-')) for field in self.ordering]
+        encoded = base64.urlsafe_b64encode(json.dumps(position, default=str).encode('utf-8')).decode('ascii')
+
+        url = replace_query_param(self.base_url, self.cursor_query_param, encoded)
+        return replace_query_param(url, self.page_size_query_param, self.page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        return self.encode_cursor(self.page[-1])
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor returned in the `next` link of the previous page',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results per page (max {self.max_page_size}), enables pagination',
+                'schema': {'type': 'integer'},
+            },
+        ]
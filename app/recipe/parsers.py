@@ -0,0 +1,29 @@
+from django.conf import settings
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from core.parsers import loads, read_body
+
+
+class NDJSONParser(BaseParser):
+    """Parse newline delimited JSON into a list with one item per non-empty line."""
+    media_type = 'application/x-ndjson'
+    max_body_size = None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+
+        for number, line in enumerate(read_body(stream, parser_context, self.max_body_size).splitlines(), start=1):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                items.append(loads(line, encoding))
+            except ValueError as exc:
+                raise ParseError(f'NDJSON parse error on line {number} - {exc}')
+
+        return items
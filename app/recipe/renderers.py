@@ -0,0 +1,34 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline delimited JSON.
+
+    Streaming views write their own body, so this only renders error payloads.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return json.dumps(data, ensure_ascii=False).encode(self.charset) + b'\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """Comma separated values, rendering error payloads as a one column `detail` table."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        detail = data.get('detail', data) if isinstance(data, dict) else data
+        return f'detail\r\n"{str(detail).replace(chr(34), chr(34) * 2)}"\r\n'.encode(self.charset)
@@ -1,23 +1,246 @@
+import decimal
+from collections import defaultdict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models, transaction
+
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
 from core.models import Recipe, Tag, Ingredient
+from .bulk import resolve_names
+
+
+# Largest id of the bigint primary keys; larger numbers cannot be bound as query parameters.
+MAX_ID = 2 ** 63 - 1
+
+
+class DynamicFieldsMixin:
+    """Takes optional `fields` / `exclude` arguments restricting which fields are rendered."""
+
+    def __init__(self, *args, fields=None, exclude=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        keep = set(self.fields) if fields is None else set(fields)
+        for name in set(self.fields) - keep | set(exclude or ()):
+            self.fields.pop(name, None)
+
+
+def _identity(value):
+    return value
+
+
+class ValuesListSerializer(serializers.ListSerializer):
+    """
+    Renders `values()` rows of list actions straight into dicts.
+
+    Every field gets a converter compiled once per serializer instead of going
+    through DRF's per-row field machinery, and nested many-to-many fields are
+    loaded for all rows with one query per relation. Model instances are
+    rendered the regular way, so the output is the same for both inputs.
+    """
+    plain_fields = (serializers.CharField, serializers.IntegerField)
+
+    def _rendered_fields(self, serializer):
+        return [field for field in serializer.fields.values() if not field.write_only]
+
+    def _compile(self, field, model):
+        """Return a converter from the database value of `field` to its representation, or None if unsupported."""
+        if field.source == '*' or '.' in field.source:
+            return None
+
+        if type(field) in self.plain_fields:
+            return _identity
+
+        if isinstance(field, serializers.DecimalField):
+            if not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING) or field.localize:
+                return lambda value: None if value is None else field.to_representation(value)
+
+            context = decimal.getcontext().copy()
+            if field.max_digits is not None:
+                context.prec = field.max_digits
+            exponent = decimal.Decimal('.1') ** field.decimal_places if field.decimal_places is not None else None
+
+            def to_decimal_string(value):
+                if value is None:
+                    return None
+                if exponent is not None:
+                    value = value.quantize(exponent, rounding=field.rounding, context=context)
+                return '{:f}'.format(value)
+
+            return to_decimal_string
+
+        if isinstance(field, serializers.FileField) and getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+            storage = model._meta.get_field(field.source).storage
+            request = self.context.get('request')
+            build_url = request.build_absolute_uri if request is not None else _identity
+
+            return lambda name: build_url(storage.url(name)) if name else None
+
+        return None
+
+    def _related(self, field):
+        """Return `(relation, nested fields)` for a nested many-to-many serializer, or None if unsupported."""
+        if not isinstance(field, serializers.ListSerializer) or not isinstance(field.child, serializers.ModelSerializer):
+            return None
+
+        try:
+            relation = self.child.Meta.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+
+        if not relation.many_to_many or relation.auto_created:
+            return None
+
+        return relation, self._rendered_fields(field.child)
+
+    @property
+    def plan(self):
+        """`(columns, fields)` to render rows with, or None if some field has no fast converter."""
+        if not hasattr(self, '_plan'):
+            self._plan = self._build_plan()
+
+        return self._plan
+
+    def _build_plan(self):
+        """
+        Columns to select and `(name, column, converter, relation)` per rendered field.
+
+        `relation` is set for nested many-to-many fields, whose converter then
+        describes the nested fields instead of a single column.
+        """
+        columns, fields = [self.child.Meta.model._meta.pk.name], []
+
+        for field in self._rendered_fields(self.child):
+            nested = self._related(field)
 
+            if nested is not None:
+                relation, nested_fields = nested
+                converters = [(child.field_name, child.source, self._compile(child, relation.related_model)) for child in nested_fields]
+                if any(converter is None for _name, _source, converter in converters):
+                    return None
+                fields.append((field.field_name, None, converters, relation))
+                continue
+
+            converter = self._compile(field, self.child.Meta.model)
+            if converter is None:
+                return None
+
+            columns.append(field.source)
+            fields.append((field.field_name, field.source, converter, None))
+
+        return list(dict.fromkeys(columns)), fields
+
+    def values_queryset(self, queryset):
+        """Turn `queryset` into `values()` rows holding every column the plan and the ordering need, or None if unsupported."""
+        if self.plan is None:
+            return None
+
+        ordering = [name.lstrip('-') for name in queryset.query.order_by if isinstance(name, str)]
+        return queryset.prefetch_related(None).values(*dict.fromkeys(self.plan[0] + ordering))
+
+    def _load_related(self, relation, converters, pks):
+        """Group the rendered related rows of `pks` by owner, ordered by primary key like the prefetch of the regular path."""
+        through = relation.remote_field.through
+        source, target = relation.m2m_field_name(), relation.m2m_reverse_field_name()
+        groups = defaultdict(list)
+
+        links = through.objects.filter(**{f'{source}_id__in': pks}).order_by(f'{target}_id')
+        for owner, *values in links.values_list(f'{source}_id', *[f'{target}__{column}' for _name, column, _converter in converters]):
+            groups[owner].append({name: converter(value) for (name, _column, converter), value in zip(converters, values)})
+
+        return groups
+
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, models.Manager) else data)
+
+        if not rows or not isinstance(rows[0], dict):
+            return super().to_representation(rows)
+
+        columns, fields = self.plan
+        pk = columns[0]
+        pks = [row[pk] for row in rows]
+        groups = {name: self._load_related(relation, converters, pks) for name, _column, converters, relation in fields if relation is not None}
+
+        return [
+            {
+                name: converter(row[column]) if relation is None else groups[name].get(row[pk], [])
+                for name, column, converter, relation in fields
+            }
+            for row in rows
+        ]
+
+
+class UniqueNameMixin:
+    """Rejects renaming a tag or ingredient to a name its owner already uses."""
+
+    def validate_name(self, value):
+        if self.instance is not None:
+            model = self.Meta.model
+            if model.objects.filter(user=self.instance.user_id, name=value).exclude(pk=self.instance.pk).exists():
+                raise serializers.ValidationError(f'You already have a {model._meta.verbose_name} with this name.')
+
+        return value
+
+
+class UsageCountMixin:
+    """Renders the `usage` annotation only when the view asks for it through the `with_counts` context flag."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if not self.context.get('with_counts'):
+            self.fields.pop('usage', None)
+
+
+class TagSerializer(UniqueNameMixin, UsageCountMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    usage = serializers.IntegerField(read_only=True)
 
-class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'usage')
         read_only_fields = ('id',)
+        list_serializer_class = ValuesListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(UniqueNameMixin, UsageCountMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    usage = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Ingredient
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'usage')
         read_only_fields = ('id',)
+        list_serializer_class = ValuesListSerializer
+
+
+class SuggestionSerializer(serializers.Serializer):
+    """Documents the items of the suggest actions."""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    usage = serializers.IntegerField()
+
+
+class MergeSerializer(serializers.Serializer):
+    """Request of the merge actions: fold `sources` into `target`, optionally renaming it to `name`."""
+    sources = serializers.ListField(child=serializers.IntegerField(min_value=1, max_value=MAX_ID), min_length=1, max_length=10000)
+    target = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+    name = serializers.CharField(max_length=255, required=False)
+
+    def validate(self, attrs):
+        model, user = self.context['model'], self.context['request'].user
+        ids = {attrs['target'], *attrs['sources']}
+        found = set(model.objects.filter(user=user, pk__in=ids).values_list('id', flat=True))
+
+        if ids - found:
+            raise serializers.ValidationError({'sources': f'Unknown id(s): {", ".join(str(pk) for pk in sorted(ids - found))}'})
+
+        if 'name' in attrs and model.objects.filter(user=user, name=attrs['name']).exclude(pk__in=ids).exists():
+            raise serializers.ValidationError({'name': f'You already have a {model._meta.verbose_name} with this name.'})
+
+        return attrs
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
 
@@ -25,41 +248,44 @@ class RecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'title', 'time_in_minutes', 'price', 'link', 'tags', 'ingredients')
         read_only_fields = ('id',)
+        list_serializer_class = ValuesListSerializer
 
-    def _get_or_create_tags(self, tags, recipe):
-        user = self.context['request'].user
+    def _set_related(self, recipe, relation, model, items, replace=False):
+        """
+        Resolve all names with one lookup and attach them with one through-table insert.
 
-        for tag_obj in tags:
-            tag, created = Tag.objects.get_or_create(user=user, **tag_obj)
-            recipe.tags.add(tag)
+        With `replace` only the difference against the current links is written,
+        so an unchanged list costs no writes at all.
+        """
+        objects = resolve_names(model, self.context['request'].user, (item['name'] for item in items))
+        manager = getattr(recipe, relation)
 
-    def _get_or_create_ingredients(self, ingredients, recipe):
-        user = self.context['request'].user
-        for ingredient_obj in ingredients:
-            ingredient, created = Ingredient.objects.get_or_create(user=user, **ingredient_obj)
-            recipe.ingredients.add(ingredient)
+        if replace:
+            manager.set(objects.values())
+        elif objects:
+            manager.add(*objects.values())
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
 
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        self._set_related(recipe, 'tags', Tag, tags)
+        self._set_related(recipe, 'ingredients', Ingredient, ingredients)
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
 
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._set_related(instance, 'tags', Tag, tags, replace=True)
 
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._set_related(instance, 'ingredients', Ingredient, ingredients, replace=True)
 
         for attr, val in validated_data.items():
             setattr(instance, attr, val)
@@ -0,0 +1,11 @@
+from django.dispatch import receiver
+
+from core.models import user_data_changed
+from .cache import response_cache
+from .suggest import suggestion_index
+
+
+@receiver(user_data_changed)
+def drop_cached_responses(sender, user_id, **kwargs):
+    response_cache.invalidate(user_id)
+    suggestion_index.clear(user_id)
@@ -0,0 +1,104 @@
+"""
+Prefix suggestions for tag and ingredient names
+"""
+import heapq
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Count
+
+
+DEFAULTS = {
+    'CACHE': True,
+    'MAX_USERS': 1000,
+    'MAX_NAMES': 20000,
+    'LIMIT': 10,
+    'MAX_LIMIT': 50,
+}
+
+
+def suggest_options():
+    return {**DEFAULTS, **getattr(settings, 'RECIPE_SUGGEST', {})}
+
+
+def suggestion_queryset(queryset, prefix):
+    """Rows of `queryset` whose name starts with `prefix`, most used first."""
+    return (
+        queryset.filter(name__istartswith=prefix)
+        .annotate(usage=Count('recipe'))
+        .order_by('-usage', 'name', 'id')
+        .values('id', 'name', 'usage')
+    )
+
+
+class SuggestionIndex:
+    """
+    Per-process cache of the names of each user, sorted case-insensitively.
+
+    An entry holds every `(key, name, usage, id)` of one user and model and is
+    only valid for the data version it was built at; any write to the user's
+    tags, ingredients or recipes bumps the version and so rebuilds it on the
+    next lookup. A prefix is answered with a bisect on the sorted keys and a
+    partial sort of the matching range by usage. Users with more than
+    `MAX_NAMES` names are always answered by the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def clear(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == user_id]:
+                    del self._entries[key]
+
+    def _load(self, queryset, max_names):
+        rows = list(queryset.annotate(usage=Count('recipe')).values_list('name', 'usage', 'id')[:max_names + 1])
+        if len(rows) > max_names:
+            return None
+
+        rows = sorted((name.upper(), name, usage, pk) for name, usage, pk in rows)
+        return [row[0] for row in rows], rows
+
+    def _entry(self, user, queryset, options):
+        key = (user.pk, queryset.model._meta.label_lower)
+
+        with self._lock:
+            version, entry = self._entries.get(key, (None, None))
+            if version == user.data_version:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._load(queryset, options['MAX_NAMES'])
+
+        with self._lock:
+            self._entries[key] = (user.data_version, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > options['MAX_USERS']:
+                self._entries.popitem(last=False)
+
+        return entry
+
+    def suggest(self, user, queryset, prefix, limit):
+        """Up to `limit` `{'id', 'name', 'usage'}` of `queryset`, the names of `user`, starting with `prefix`."""
+        options = suggest_options()
+        entry = self._entry(user, queryset, options) if options['CACHE'] else None
+
+        if entry is None:
+            return list(suggestion_queryset(queryset, prefix)[:limit])
+
+        keys, rows = entry
+        prefix = prefix.upper()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '\U0010ffff', start)
+
+        best = heapq.nsmallest(limit, rows[start:end], key=lambda row: (-row[2], row[1], row[3]))
+        return [{'id': pk, 'name': name, 'usage': usage} for _key, name, usage, pk in best]
+
+
+suggestion_index = SuggestionIndex()
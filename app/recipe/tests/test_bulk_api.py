@@ -0,0 +1,343 @@
+"""
+Tests for bulk recipe endpoints
+"""
+import json
+import random
+import threading
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.bulk import resolve_names
+
+
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def recipe_payload(i, tags=(), ingredients=()):
+    return {
+        'title': f'Recipe {i}',
+        'time_in_minutes': 10,
+        'price': '5.50',
+        'tags': [{'name': name} for name in tags],
+        'ingredients': [{'name': name} for name in ingredients],
+    }
+
+
+class PublicBulkApiTest(TestCase):
+    def test_auth_required(self):
+        res = APIClient().post(BULK_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BulkImportApiTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+
+    def test_import_json_array(self):
+        Tag.objects.create(user=self.user, name='vegan')
+        payload = [recipe_payload(1, tags=['vegan', 'quick'], ingredients=['salt']), recipe_payload(2, tags=['quick'])]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['errors'], [])
+        self.assertEqual([item['index'] for item in res.data['created']], [0, 1])
+
+        r1 = Recipe.objects.get(id=res.data['created'][0]['id'])
+        r2 = Recipe.objects.get(id=res.data['created'][1]['id'])
+
+        self.assertEqual(r1.title, 'Recipe 1')
+        self.assertEqual(r1.user, self.user)
+        self.assertEqual(r1.price, Decimal('5.50'))
+        self.assertEqual(sorted(r1.tags.values_list('name', flat=True)), ['quick', 'vegan'])
+        self.assertEqual(list(r1.ingredients.values_list('name', flat=True)), ['salt'])
+        self.assertEqual(list(r2.tags.values_list('name', flat=True)), ['quick'])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+
+    def test_import_ndjson(self):
+        body = '\n'.join(json.dumps(recipe_payload(i)) for i in range(3)) + '\n'
+
+        res = self.client.post(BULK_URL, body, content_type='application/x-ndjson')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+
+    def test_import_ndjson_parse_error(self):
+        res = self.client.post(BULK_URL, '{"title": "a"}\nnot json\n', content_type='application/x-ndjson')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('line 2', res.data['detail'])
+
+    def test_import_reports_invalid_items(self):
+        payload = [recipe_payload(1), {'title': 'no price'}, 'not an object', recipe_payload(2)]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([item['index'] for item in res.data['created']], [0, 3])
+        self.assertEqual([item['index'] for item in res.data['errors']], [1, 2])
+        self.assertIn('price', res.data['errors'][0]['errors'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_import_nothing_valid(self):
+        res = self.client.post(BULK_URL, [{'title': 'no price'}], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_import_requires_list(self):
+        res = self.client.post(BULK_URL, recipe_payload(1), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_query_count_is_constant(self):
+        def count(items):
+            payload = [recipe_payload(i, tags=[f'tag{i}', 'shared'], ingredients=[f'ing{i}']) for i in range(items)]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(BULK_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(ctx)
+
+        self.assertEqual(count(2), count(40))
+
+    def test_imported_recipes_are_searchable(self):
+        self.client.post(BULK_URL, [recipe_payload(1, tags=['breakfast'])], format='json')
+
+        res = self.client.get(reverse('recipe:recipe-list'), {'search': 'breakfast'})
+
+        self.assertEqual(len(res.data), 1)
+
+
+def create_recipe(user, title='Some title', **params):
+    return Recipe.objects.create(user=user, title=title, time_in_minutes=params.pop('time_in_minutes', 5), price=params.pop('price', Decimal('12.5')), **params)
+
+
+class BulkUpdateApiTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+        self.recipes = [create_recipe(self.user, title=f'Recipe {i}') for i in range(3)]
+
+    def test_shared_update(self):
+        other = create_recipe(get_user_model().objects.create_user(email='other@example.com', password='password123'))
+        ids = [recipe.id for recipe in self.recipes[:2]]
+
+        res = self.client.patch(BULK_URL, {'ids': ids + [other.id], 'time_in_minutes': 42}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data['results'], [
+            {'id': ids[0], 'status': 200}, {'id': ids[1], 'status': 200}, {'id': other.id, 'status': 404},
+        ])
+        self.assertEqual(sorted(Recipe.objects.filter(time_in_minutes=42).values_list('id', flat=True)), sorted(ids))
+        other.refresh_from_db()
+        self.assertEqual(other.time_in_minutes, 5)
+
+    def test_per_id_update(self):
+        payload = [
+            {'id': self.recipes[0].id, 'title': 'First'},
+            {'id': self.recipes[1].id, 'title': 'Second', 'price': '1.00'},
+            {'id': self.recipes[2].id, 'price': 'not a price'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([result['status'] for result in res.data['results']], [200, 200, 400])
+        self.assertIn('price', res.data['results'][2]['errors'])
+        for recipe in self.recipes:
+            recipe.refresh_from_db()
+        self.assertEqual(self.recipes[0].title, 'First')
+        self.assertEqual((self.recipes[1].title, self.recipes[1].price), ('Second', Decimal('1.00')))
+        self.assertEqual(self.recipes[2].price, Decimal('12.5'))
+
+    def test_update_tags(self):
+        kept = Tag.objects.create(user=self.user, name='kept')
+        removed = Tag.objects.create(user=self.user, name='removed')
+        for recipe in self.recipes:
+            recipe.tags.add(kept, removed)
+        ids = [recipe.id for recipe in self.recipes]
+
+        res = self.client.patch(BULK_URL, {'ids': ids, 'tags': [{'name': 'kept'}, {'name': 'added'}]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for recipe in self.recipes:
+            self.assertEqual(sorted(recipe.tags.values_list('name', flat=True)), ['added', 'kept'])
+        self.assertEqual(Tag.objects.filter(user=self.user, name='added').count(), 1)
+
+        search = self.client.get(reverse('recipe:recipe-list'), {'search': 'added'})
+        self.assertEqual(len(search.data), 3)
+
+    def test_update_bumps_data_version(self):
+        version = self.user.data_version
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(BULK_URL, {'ids': [self.recipes[0].id], 'title': 'changed'}, format='json')
+
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.data_version, version)
+
+    def test_update_invalid_body(self):
+        for payload in ({'title': 'no ids'}, {'ids': 'nope'}, [{'title': 'no id'}], ['nope']):
+            res = self.client.patch(BULK_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, payload)
+
+    def test_out_of_range_ids_rejected(self):
+        for ids in ([10 ** 30], [-1], [0], [2 ** 63]):
+            with self.subTest(ids=ids):
+                res = self.client.patch(BULK_URL, {'ids': ids, 'title': 'changed'}, format='json')
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('ids', res.data)
+                self.assertEqual(self.client.delete(BULK_URL, {'ids': ids}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.patch(BULK_URL, [{'id': 10 ** 30, 'title': 'changed'}], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_query_count_is_constant(self):
+        def count(recipes):
+            payload = [{'id': recipe.id, 'title': f'new {recipe.id}', 'tags': [{'name': f'tag {recipe.id}'}]} for recipe in recipes]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.patch(BULK_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return len(ctx)
+
+        small = count(self.recipes[:1])
+        large = count([create_recipe(self.user) for _ in range(30)])
+
+        self.assertEqual(small, large)
+
+
+class BulkDeleteApiTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+
+    def test_delete(self):
+        tag = Tag.objects.create(user=self.user, name='tag')
+        recipes = [create_recipe(self.user) for _ in range(3)]
+        for recipe in recipes:
+            recipe.tags.add(tag)
+        other = create_recipe(get_user_model().objects.create_user(email='other@example.com', password='password123'))
+        ids = [recipes[0].id, recipes[1].id, other.id]
+
+        res = self.client.delete(BULK_URL, {'ids': ids}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([result['status'] for result in res.data['results']], [204, 204, 404])
+        self.assertEqual(list(Recipe.objects.filter(user=self.user).values_list('id', flat=True)), [recipes[2].id])
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+        self.assertEqual(Recipe.tags.through.objects.count(), 1)
+
+    def test_delete_bumps_data_version(self):
+        version = self.user.data_version
+        recipe = create_recipe(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(BULK_URL, {'ids': [recipe.id]}, format='json')
+
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.data_version, version)
+
+    def test_delete_query_count_is_constant(self):
+        def count(items):
+            ids = [create_recipe(self.user).id for _ in range(items)]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.delete(BULK_URL, {'ids': ids}, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return len(ctx)
+
+        self.assertEqual(count(1), count(30))
+
+    def test_delete_requires_ids(self):
+        res = self.client.delete(BULK_URL, {}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ResolveNamesTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+
+    def test_resolves_existing_and_creates_missing(self):
+        existing = Tag.objects.create(user=self.user, name='existing')
+        Tag.objects.create(user=get_user_model().objects.create_user(email='other@example.com', password='password123'), name='new')
+
+        with CaptureQueriesContext(connection) as ctx:
+            tags = resolve_names(Tag, self.user, ['existing', 'new', 'new'])
+
+        self.assertEqual(len(ctx), 3)
+        self.assertEqual(tags['existing'], existing)
+        self.assertEqual(tags['new'].user, self.user)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_skips_rows_inserted_after_the_lookup(self):
+        """A row another writer inserted between the lookup and the insert is reused, not duplicated."""
+        concurrent = []
+        original_filter = Tag.objects.filter
+
+        def filter_then_race(*args, **kwargs):
+            queryset = original_filter(*args, **kwargs)
+            if not concurrent:
+                list(queryset)
+                concurrent.append(Tag.objects.create(user=self.user, name='raced'))
+            return queryset
+
+        with patch.object(Tag.objects, 'filter', side_effect=filter_then_race):
+            tags = resolve_names(Tag, self.user, ['raced', 'other'])
+
+        self.assertEqual(tags['raced'], concurrent[0])
+        self.assertEqual(Tag.objects.filter(user=self.user, name='raced').count(), 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Concurrent writers need a database with row-level locking')
+class ConcurrentResolveNamesTest(TransactionTestCase):
+    writers = 8
+
+    def test_parallel_writers_share_rows(self):
+        user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        names = [f'tag {i}' for i in range(20)]
+        barrier = threading.Barrier(self.writers)
+        results, errors = [], []
+
+        def writer(seed):
+            try:
+                shuffled = random.Random(seed).sample(names, len(names))
+                barrier.wait()
+                with transaction.atomic():
+                    results.append({name: tag.pk for name, tag in resolve_names(Tag, user, shuffled).items()})
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=writer, args=(seed,)) for seed in range(self.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Tag.objects.filter(user=user).count(), len(names))
+        self.assertTrue(all(result == results[0] for result in results))
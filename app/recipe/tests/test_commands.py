@@ -0,0 +1,60 @@
+"""
+Test recipe management commands
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.models import Recipe
+
+
+class BenchmarkCommandTest(TestCase):
+    def test_benchmark_recipe_filters(self):
+        out = StringIO()
+
+        call_command('benchmark_recipe_filters', recipes=50, tags=5, repeat=1, stdout=out)
+
+        self.assertIn('match=all EXISTS', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_recipe_serialization(self):
+        out = StringIO()
+
+        call_command('benchmark_recipe_serialization', recipes=20, repeat=1, stdout=out)
+
+        self.assertIn('values()', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_recipe_formats(self):
+        out = StringIO()
+
+        call_command('benchmark_recipe_formats', recipes=20, repeat=1, stdout=out)
+
+        self.assertIn('msgpack size', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_recipe_updates(self):
+        out = StringIO()
+
+        call_command('benchmark_recipe_updates', recipes=20, updates=10, changed=0.5, repeat=1, stdout=out)
+
+        self.assertIn('diff', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+
+class ExplainQueriesCommandTest(TestCase):
+    def test_explain_queries_reports_every_endpoint(self):
+        get_user_model().objects.create_user(email='user@example.com', password='password123')
+        out = StringIO()
+
+        call_command('explain_queries', stdout=out)
+
+        for name in ('recipe list', 'recipe detail', 'tag list', 'ingredient list assigned_only'):
+            self.assertIn(f'{name}:', out.getvalue())
+
+    def test_explain_queries_without_users(self):
+        with self.assertRaises(CommandError):
+            call_command('explain_queries', stdout=StringIO())
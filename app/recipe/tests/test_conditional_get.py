@@ -0,0 +1,110 @@
+"""
+Tests for ETag handling on recipe endpoints
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=(recipe_id,))
+
+
+def create_recipe(user, **params):
+    defaults = {'title': 'Some title', 'time_in_minutes': 5, 'price': Decimal('12.5')}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = create_recipe(self.user)
+
+    def test_list_not_modified(self):
+        res = self.client.get(RECIPE_URL)
+        etag = res['ETag']
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        # Only the token lookup runs, the recipe queries are skipped.
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_etag_changes_on_write(self):
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.tags.add(Tag.objects.create(user=self.user, name='tag1'))
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+        etag = res['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+
+        self.assertEqual(self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_etag_depends_on_query(self):
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        res = self.client.get(RECIPE_URL, {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_other_users_writes_keep_etag(self):
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        user2 = get_user_model().objects.create_user(email='user2@example.com', password='password123')
+        create_recipe(user2)
+
+        res = self.client.get(detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_never_validates_a_stale_copy(self):
+        res = self.client.get(TAGS_URL)
+        self.assertNotIn('Last-Modified', res)
+
+        # A write in the same second as the read.
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(user=self.user, name='tag1')
+        res = self.client.get(TAGS_URL, HTTP_IF_MODIFIED_SINCE=http_date())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag['name'] for tag in res.data], ['tag1'])
+
+    def test_tag_rename_changes_etag(self):
+        tag = Tag.objects.create(user=self.user, name='tag1')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('recipe:tag-detail', args=(tag.id,)), {'name': 'tag2'})
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['name'], 'tag2')
@@ -0,0 +1,118 @@
+"""
+Tests for the streaming recipe export
+"""
+import csv
+import io
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def create_recipe(user, **params):
+    defaults = {'title': 'Some title', 'time_in_minutes': 5, 'price': Decimal('12.5'), 'description': 'Some description'}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def read_body(res):
+    return b''.join(res.streaming_content).decode('utf-8')
+
+
+class PublicExportApiTest(TestCase):
+    def test_auth_required(self):
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateExportApiTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+
+    def test_export_ndjson(self):
+        r1 = create_recipe(self.user, title='r1')
+        r2 = create_recipe(self.user, title='r2')
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='salt')
+        r1.tags.add(tag)
+        r1.ingredients.add(ingredient)
+        create_recipe(get_user_model().objects.create_user(email='user2@example.com', password='password123'))
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson; charset=utf-8')
+
+        rows = [json.loads(line) for line in read_body(res).splitlines()]
+
+        self.assertEqual([row['id'] for row in rows], [r2.id, r1.id])
+        self.assertEqual(rows[1], {
+            'id': r1.id,
+            'title': 'r1',
+            'time_in_minutes': 5,
+            'price': '12.50',
+            'link': '',
+            'description': 'Some description',
+            'image': None,
+            'tags': [{'id': tag.id, 'name': 'vegan'}],
+            'ingredients': [{'id': ingredient.id, 'name': 'salt'}],
+        })
+
+    def test_export_csv(self):
+        recipe = create_recipe(self.user, title='Soup, hot')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='a'), Tag.objects.create(user=self.user, name='b'))
+
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res['Content-Type'], 'text/csv; charset=utf-8')
+
+        rows = list(csv.DictReader(io.StringIO(read_body(res))))
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Soup, hot')
+        self.assertEqual(rows[0]['tags'], 'a|b')
+        self.assertEqual(rows[0]['ingredients'], '')
+
+    def test_export_csv_by_accept_header(self):
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT='text/csv')
+
+        self.assertEqual(read_body(res).splitlines(), ['id,title,time_in_minutes,price,link,description,image,tags,ingredients'])
+
+    def test_export_honours_list_filters(self):
+        r1 = create_recipe(self.user)
+        create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        r1.tags.add(tag)
+
+        rows = read_body(self.client.get(EXPORT_URL, {'tags': tag.id})).splitlines()
+
+        self.assertEqual([json.loads(row)['id'] for row in rows], [r1.id])
+
+    @patch('recipe.views.RecipeViewSet.export_chunk_size', 2)
+    def test_export_loads_links_per_chunk(self):
+        for i in range(5):
+            create_recipe(self.user).tags.add(Tag.objects.create(user=self.user, name=f'tag{i}'))
+
+        res = self.client.get(EXPORT_URL)
+
+        # One recipe query plus a tags and an ingredients query for each of the three chunks.
+        with self.assertNumQueries(7):
+            rows = read_body(res).splitlines()
+
+        self.assertEqual(len(rows), 5)
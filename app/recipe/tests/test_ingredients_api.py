@@ -77,6 +77,16 @@ class PrivateIngredientsApiTest(TestCase):
 
         self.assertEqual(ing.name, payload['name'])
 
+    def test_update_ingredient_duplicate_name(self):
+        create_ingredient(self.user, 'taken')
+        ing = create_ingredient(self.user, 'ing1')
+
+        res = self.client.patch(detail_url(ing.id), {'name': 'taken'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        ing.refresh_from_db()
+        self.assertEqual(ing.name, 'ing1')
+
     def test_delete_ingridient(self):
         ing = create_ingredient(self.user, 'ing1')
 
@@ -113,3 +123,14 @@ class PrivateIngredientsApiTest(TestCase):
 
         data = IngredientSerializer([ing], many=True).data
         self.assertEqual(res.data, data)
+
+    def test_ingredients_with_counts(self):
+        ing1 = create_ingredient(self.user, 'ing1')
+        ing2 = create_ingredient(self.user, 'ing2')
+        Recipe.objects.create(title='asd', price='5.5', time_in_minutes=30, user=self.user).ingredients.add(ing1, ing2)
+        Recipe.objects.create(title='xzc', price='3.5', time_in_minutes=20, user=self.user).ingredients.add(ing2)
+
+        res = self.client.get(INGRIDIENT_URL, {'with_counts': 1, 'assigned_only': 1, 'ordering': 'usage'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': ing1.id, 'name': 'ing1', 'usage': 1}, {'id': ing2.id, 'name': 'ing2', 'usage': 2}])
@@ -0,0 +1,137 @@
+"""
+Tests for merging tags and ingredients
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+TAGS_MERGE_URL = reverse('recipe:tag-merge')
+INGREDIENTS_MERGE_URL = reverse('recipe:ingredient-merge')
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def create_recipe(user, tags=(), ingredients=(), **params):
+    recipe = Recipe.objects.create(user=user, title=params.get('title', 'Some title'), time_in_minutes=5, price='12.5')
+    recipe.tags.add(*tags)
+    recipe.ingredients.add(*ingredients)
+
+    return recipe
+
+
+class MergeApiTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+        self.vegan, self.lower, self.upper = (Tag.objects.create(user=self.user, name=name) for name in ('Vegan', 'vegan ', 'VEGAN'))
+
+    def merge(self, payload, url=TAGS_MERGE_URL):
+        return self.client.post(url, payload, format='json')
+
+    def test_merge_moves_links_and_deletes_sources(self):
+        both = create_recipe(self.user, tags=[self.vegan, self.lower])
+        lower = create_recipe(self.user, tags=[self.lower, self.upper])
+        untouched = create_recipe(self.user)
+
+        res = self.merge({'target': self.vegan.id, 'sources': [self.lower.id, self.upper.id]})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'id': self.vegan.id, 'name': 'Vegan'})
+        self.assertEqual(list(Tag.objects.filter(user=self.user).values_list('id', flat=True)), [self.vegan.id])
+        self.assertEqual(list(both.tags.values_list('id', flat=True)), [self.vegan.id])
+        self.assertEqual(list(lower.tags.values_list('id', flat=True)), [self.vegan.id])
+        self.assertFalse(untouched.tags.exists())
+
+    def test_merge_and_rename_to_source_name(self):
+        recipe = create_recipe(self.user, tags=[self.upper])
+
+        res = self.merge({'target': self.vegan.id, 'sources': [self.lower.id, self.upper.id], 'name': 'VEGAN'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(recipe.tags.values_list('name', flat=True)), ['VEGAN'])
+
+    def test_merge_refreshes_search_and_data_version(self):
+        create_recipe(self.user, tags=[self.upper], title='Salad')
+        version = self.user.data_version
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.merge({'target': self.vegan.id, 'sources': [self.upper.id], 'name': 'plantbased'})
+        self.user.refresh_from_db()
+
+        self.assertGreater(self.user.data_version, version)
+        self.assertEqual([r['title'] for r in self.client.get(RECIPE_URL, {'search': 'plantbased'}).data], ['Salad'])
+
+    def test_rename_conflict(self):
+        Tag.objects.create(user=self.user, name='Other')
+
+        res = self.merge({'target': self.vegan.id, 'sources': [self.lower.id], 'name': 'Other'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Tag.objects.filter(id=self.lower.id).exists())
+
+    def test_unknown_and_foreign_ids_rejected(self):
+        other = get_user_model().objects.create_user(email='other@example.com', password='password123')
+        foreign = Tag.objects.create(user=other, name='Vegan')
+
+        for payload in (
+            {'target': self.vegan.id, 'sources': [foreign.id]},
+            {'target': foreign.id, 'sources': [self.lower.id]},
+            {'target': self.vegan.id, 'sources': [0]},
+            {'target': self.vegan.id, 'sources': []},
+            {'target': self.vegan.id, 'sources': [10 ** 30]},
+            {'target': 10 ** 30, 'sources': [self.lower.id]},
+        ):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.merge(payload).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(Tag.objects.count(), 4)
+
+    def test_merge_ingredients(self):
+        salt, sea_salt = Ingredient.objects.create(user=self.user, name='salt'), Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = create_recipe(self.user, ingredients=[sea_salt])
+
+        res = self.merge({'target': salt.id, 'sources': [sea_salt.id]}, INGREDIENTS_MERGE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(recipe.ingredients.all()), [salt])
+
+    def test_query_count_does_not_depend_on_links(self):
+        def count(recipes):
+            target, source = (Tag.objects.create(user=self.user, name=f'{recipes} {i}') for i in range(2))
+            for _ in range(recipes):
+                create_recipe(self.user, tags=[source])
+
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.merge({'target': target.id, 'sources': [source.id]}).status_code, status.HTTP_200_OK)
+
+            self.assertEqual(Recipe.objects.filter(tags=target).count(), recipes)
+            return len(ctx), [q['sql'] for q in ctx.captured_queries]
+
+        small, _small_sql = count(1)
+        large, large_sql = count(30)
+
+        self.assertEqual(small, large, '\n'.join(large_sql))
+
+    def test_query_count_does_not_depend_on_sources(self):
+        def count(sources):
+            target, *tags = (Tag.objects.create(user=self.user, name=f'{sources} {i}') for i in range(sources + 1))
+            recipe = create_recipe(self.user, tags=tags)
+
+            with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self.merge({'target': target.id, 'sources': [tag.id for tag in tags]}).status_code, status.HTTP_200_OK)
+
+            self.assertEqual(list(recipe.tags.all()), [target])
+            return len(ctx), [q['sql'] for q in ctx.captured_queries]
+
+        small, _small_sql = count(2)
+        large, large_sql = count(40)
+
+        self.assertEqual(small, large, '\n'.join(large_sql))
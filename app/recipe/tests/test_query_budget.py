@@ -0,0 +1,162 @@
+"""
+Query budgets for recipe endpoints.
+
+Every endpoint is exercised twice, once with a small data set and once with a
+much larger one. The number of queries must stay the same and within the
+endpoint's budget, so a per-row query sneaking back in fails here.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=(recipe_id,))
+
+
+def create_recipe(user, tags=0, ingredients=0, **params):
+    defaults = {'title': 'Some title', 'time_in_minutes': 5, 'price': Decimal('12.5')}
+    defaults.update(params)
+    recipe = Recipe.objects.create(user=user, **defaults)
+
+    recipe.tags.add(*[Tag.objects.create(user=user, name=f'tag{recipe.id}-{i}') for i in range(tags)])
+    recipe.ingredients.add(*[Ingredient.objects.create(user=user, name=f'ing{recipe.id}-{i}') for i in range(ingredients)])
+
+    return recipe
+
+
+class QueryBudgetMixin:
+    def count_queries(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            res = func()
+
+        self.assertLess(res.status_code, status.HTTP_400_BAD_REQUEST, res.content)
+
+        return len(ctx), [q['sql'] for q in ctx.captured_queries]
+
+    def assertQueryBudget(self, budget, func, grow):
+        """Run `func` before and after `grow()` and check both runs cost the same number of queries within `budget`."""
+        small, small_sql = self.count_queries(func)
+        with self.captureOnCommitCallbacks(execute=True):
+            grow()
+        large, large_sql = self.count_queries(func)
+
+        self.assertLessEqual(large, budget, '\n'.join(large_sql))
+        self.assertEqual(small, large, 'Query count depends on the number of rows:\n' + '\n'.join(large_sql))
+
+
+class RecipeQueryBudgetTest(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user, tags=1, ingredients=1)
+
+    def grow(self):
+        for _ in range(10):
+            create_recipe(self.user, tags=3, ingredients=3)
+
+    def test_list_budget(self):
+        self.assertQueryBudget(3, lambda: self.client.get(RECIPE_URL), self.grow)
+
+    def test_filtered_list_budget(self):
+        tag = Tag.objects.create(user=self.user, name='shared')
+        self.recipe.tags.add(tag)
+
+        def grow():
+            self.grow()
+            for recipe in Recipe.objects.filter(user=self.user):
+                recipe.tags.add(tag)
+
+        self.assertQueryBudget(3, lambda: self.client.get(RECIPE_URL, {'tags': tag.id}), grow)
+
+    def test_retrieve_budget(self):
+        def grow():
+            self.recipe.tags.add(*[Tag.objects.create(user=self.user, name=f'extra{i}') for i in range(10)])
+            self.recipe.ingredients.add(*[Ingredient.objects.create(user=self.user, name=f'extra{i}') for i in range(10)])
+
+        self.assertQueryBudget(3, lambda: self.client.get(detail_url(self.recipe.id)), grow)
+
+    def test_create_budget(self):
+        payload = {'title': 'new recipe', 'time_in_minutes': 10, 'price': '5.00'}
+
+        # Includes the SAVEPOINT / RELEASE of the serializer's atomic block.
+        self.assertQueryBudget(7, lambda: self.client.post(RECIPE_URL, payload, format='json'), self.grow)
+
+    def test_update_budget(self):
+        def grow():
+            self.grow()
+            self.recipe.tags.add(*[Tag.objects.create(user=self.user, name=f'extra{i}') for i in range(10)])
+
+        self.assertQueryBudget(8, lambda: self.client.patch(detail_url(self.recipe.id), {'title': 'changed'}, format='json'), grow)
+
+    def test_create_with_related_is_constant(self):
+        def count(related):
+            payload = {
+                'title': 'new recipe', 'time_in_minutes': 10, 'price': '5.00',
+                'tags': [{'name': f'tag {related} {i}'} for i in range(related)],
+                'ingredients': [{'name': f'ing {related} {i}'} for i in range(related)],
+            }
+            return self.count_queries(lambda: self.client.post(RECIPE_URL, payload, format='json'))
+
+        small, _small_sql = count(1)
+        large, large_sql = count(20)
+
+        self.assertEqual(small, large, 'Query count depends on the number of tags and ingredients:\n' + '\n'.join(large_sql))
+
+    def test_update_with_related_is_constant(self):
+        Tag.objects.bulk_create([Tag(user=self.user, name=f'existing {i}') for i in range(10)])
+
+        def count(related):
+            names = [f'existing {i}' for i in range(related // 2)] + [f'new {related} {i}' for i in range(related - related // 2)]
+            payload = {'tags': [{'name': name} for name in names], 'ingredients': [{'name': name} for name in names]}
+            return self.count_queries(lambda: self.client.patch(detail_url(self.recipe.id), payload, format='json'))
+
+        small, _small_sql = count(2)
+        large, large_sql = count(20)
+
+        self.assertEqual(small, large, 'Query count depends on the number of tags and ingredients:\n' + '\n'.join(large_sql))
+        self.assertEqual(self.recipe.tags.count(), 20)
+
+
+class RecipeAttrQueryBudgetTest(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+        create_recipe(self.user, tags=1, ingredients=1)
+
+    def grow(self):
+        for _ in range(10):
+            create_recipe(self.user, tags=3, ingredients=3)
+
+    def test_tags_list_budget(self):
+        self.assertQueryBudget(1, lambda: self.client.get(TAGS_URL), self.grow)
+
+    def test_assigned_tags_list_budget(self):
+        self.assertQueryBudget(1, lambda: self.client.get(TAGS_URL, {'assigned_only': 1}), self.grow)
+
+    def test_tags_with_counts_budget(self):
+        params = {'with_counts': 1, 'assigned_only': 1, 'ordering': '-usage'}
+        self.assertQueryBudget(1, lambda: self.client.get(TAGS_URL, params), self.grow)
+
+        _count, sql = self.count_queries(lambda: self.client.get(TAGS_URL, {**params, 'page_size': 5}))
+        self.assertIn('EXISTS', sql[0])
+        self.assertNotIn('DISTINCT', sql[0])
+
+    def test_ingredients_list_budget(self):
+        self.assertQueryBudget(1, lambda: self.client.get(INGREDIENTS_URL), self.grow)
@@ -1,9 +1,13 @@
+import base64
+import json
 import os
 import tempfile
-
 from decimal import Decimal
+from unittest import skipUnless
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
@@ -13,6 +17,7 @@ from rest_framework.test import APIClient
 from PIL import Image
 
 from core.models import Recipe, Tag, Ingredient
+from core.search import search_recipes
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
@@ -204,6 +209,18 @@ class PrivateRecipeAPITest(TestCase):
         for tag in payload['tags']:
             self.assertTrue(recipe.tags.filter(name=tag['name'], user=self.user).exists())
 
+    def test_create_bumps_data_version_once_after_commit(self):
+        payload = {'title': 'recipe title', 'time_in_minutes': 30, 'price': Decimal('5.99'), 'tags': [{'name': 'tag1'}], 'ingredients': [{'name': 'ing1'}]}
+
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(RECIPE_URL, payload, format='json')
+
+        bumps = [i for i, query in enumerate(ctx.captured_queries) if query['sql'].startswith('UPDATE "core_user" SET "data_version"')]
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(bumps, [len(ctx) - 1])
+
     def test_update_recipe_tags(self):
         recipe = create_recipe(self.user)
         payload = {'tags': [{'name': 'tag1'}]}
@@ -242,6 +259,36 @@ class PrivateRecipeAPITest(TestCase):
 
         self.assertEqual(recipe.tags.count(), 0)
 
+    def test_update_unchanged_tags_does_not_write_links(self):
+        tags = [Tag.objects.create(user=self.user, name=f'tag{i}') for i in range(3)]
+        recipe = create_recipe(self.user)
+        recipe.tags.add(*tags)
+        payload = {'tags': [{'name': tag.name} for tag in reversed(tags)]}
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith(('INSERT', 'DELETE'))]
+        self.assertEqual(writes, [])
+        self.assertEqual(set(recipe.tags.all()), set(tags))
+
+    def test_update_tags_writes_only_the_difference(self):
+        kept, removed = Tag.objects.create(user=self.user, name='kept'), Tag.objects.create(user=self.user, name='removed')
+        recipe = create_recipe(self.user)
+        recipe.tags.add(kept, removed)
+        kept_link = Recipe.tags.through.objects.get(recipe=recipe, tag=kept)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(detail_url(recipe.id), {'tags': [{'name': 'kept'}, {'name': 'added'}]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        link_sql = [q['sql'] for q in ctx.captured_queries if 'core_recipe_tags' in q['sql']]
+        self.assertEqual(sum(sql.startswith('DELETE') for sql in link_sql), 1)
+        self.assertEqual(sum(sql.startswith('INSERT') for sql in link_sql), 1)
+        self.assertEqual(sorted(recipe.tags.values_list('name', flat=True)), ['added', 'kept'])
+        self.assertTrue(Recipe.tags.through.objects.filter(pk=kept_link.pk).exists())
+
     def test_create_recipe_with_new_ingredients(self):
         payload = {'title': 'recipe title', 'time_in_minutes': 30, 'price': Decimal('5.99'), 'ingredients': [{'name': 'ing1'}, {'name': 'ing2'}]}
 
@@ -350,6 +397,249 @@ class PrivateRecipeAPITest(TestCase):
 
         self.assertEqual(res.data, data)
 
+    def test_filter_by_all_tags(self):
+        r1 = create_recipe(user=self.user, title='res1')
+        r2 = create_recipe(user=self.user, title='res2')
+        tag1 = Tag.objects.create(user=self.user, name='tag1')
+        tag2 = Tag.objects.create(user=self.user, name='tag2')
+        tag3 = Tag.objects.create(user=self.user, name='tag3')
+        r1.tags.add(tag1, tag2, tag3)
+        r2.tags.add(tag1, tag3)
+
+        res = self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id},{tag3.id}', 'match': 'all'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, RecipeSerializer([r1], many=True).data)
+
+        res = self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag3.id}', 'match': 'all'})
+
+        self.assertEqual(res.data, RecipeSerializer([r2, r1], many=True).data)
+
+    def test_filter_by_all_tags_and_ingredients(self):
+        r1 = create_recipe(user=self.user, title='res1')
+        r2 = create_recipe(user=self.user, title='res2')
+        tag = Tag.objects.create(user=self.user, name='tag1')
+        i1 = Ingredient.objects.create(user=self.user, name='ing1')
+        i2 = Ingredient.objects.create(user=self.user, name='ing2')
+        r1.tags.add(tag)
+        r1.ingredients.add(i1, i2)
+        r2.tags.add(tag)
+        r2.ingredients.add(i1)
+
+        res = self.client.get(RECIPE_URL, {'tags': tag.id, 'ingredients': f'{i1.id},{i2.id}', 'match': 'all'})
+
+        self.assertEqual(res.data, RecipeSerializer([r1], many=True).data)
+
+    def test_filter_does_not_use_distinct(self):
+        recipe = create_recipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name='tag1')
+        tag2 = Tag.objects.create(user=self.user, name='tag2')
+        recipe.tags.add(tag1, tag2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(len(res.data), 1)
+        self.assertNotIn('DISTINCT', ctx.captured_queries[0]['sql'])
+
+    def test_filter_invalid_match(self):
+        res = self.client.get(RECIPE_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_recipes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            r1 = create_recipe(self.user, title='Creamy pasta', description='Boil water')
+            r2 = create_recipe(self.user, title='Salad', description='Goes well with pasta')
+            r3 = create_recipe(self.user, title='Soup')
+            r3.tags.add(Tag.objects.create(user=self.user, name='vegan'))
+            r3.ingredients.add(Ingredient.objects.create(user=self.user, name='garlic'))
+            create_recipe(self.user, title='Steak')
+
+        res = self.client.get(RECIPE_URL, {'search': 'pasta'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data], [r1.id, r2.id])
+
+        res = self.client.get(RECIPE_URL, {'search': 'vegan garlic'})
+
+        self.assertEqual([r['id'] for r in res.data], [r3.id])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Only PostgreSQL ranks with single precision floats')
+    def test_search_pages_through_tied_ranks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(9):
+                create_recipe(self.user, title='Green curry', description=' '.join(['curry'] * (i % 3)))
+
+        ranked = search_recipes(Recipe.objects.filter(user=self.user), 'curry').order_by('-rank', '-id')
+        expected = list(ranked.values_list('id', flat=True))
+
+        res = self.client.get(RECIPE_URL, {'search': 'curry', 'page_size': 2})
+        seen = [r['id'] for r in res.data['results']]
+
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [r['id'] for r in res.data['results']]
+
+        self.assertEqual(seen, expected)
+
+    def test_search_limited_to_user(self):
+        user2 = create_user(email='user2@example.com', password='password123')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_recipe(user2, title='Pasta')
+
+        res = self.client.get(RECIPE_URL, {'search': 'pasta'})
+
+        self.assertEqual(res.data, [])
+
+    def test_search_follows_tag_changes(self):
+        recipe = create_recipe(self.user, title='Soup')
+        tag = Tag.objects.create(user=self.user, name='dinner')
+        recipe.tags.add(tag)
+
+        tag.name = 'breakfast'
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.save()
+
+        self.assertEqual([r['id'] for r in self.client.get(RECIPE_URL, {'search': 'breakfast'}).data], [recipe.id])
+        self.assertEqual(self.client.get(RECIPE_URL, {'search': 'dinner'}).data, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.delete()
+
+        self.assertEqual(self.client.get(RECIPE_URL, {'search': 'breakfast'}).data, [])
+
+    def test_create_refreshes_search_vector_once_after_commit(self):
+        payload = {'title': 'Soup', 'time_in_minutes': 30, 'price': Decimal('5.99'), 'tags': [{'name': 'dinner'}], 'ingredients': [{'name': 'leek'}]}
+
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(RECIPE_URL, payload, format='json')
+
+        refreshes = [query for query in ctx.captured_queries if query['sql'].startswith('UPDATE "core_recipe" SET "search_vector"')]
+
+        self.assertEqual(len(refreshes), 1)
+        self.assertEqual([r['title'] for r in self.client.get(RECIPE_URL, {'search': 'leek'}).data], ['Soup'])
+
+    def test_list_sparse_fieldset(self):
+        recipe = create_recipe(self.user, title='Soup')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='tag1'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': recipe.id, 'title': 'Soup'}])
+        self.assertEqual(len(ctx), 1)
+        self.assertNotIn('description', ctx.captured_queries[0]['sql'])
+        self.assertNotIn('price', ctx.captured_queries[0]['sql'])
+
+    def test_list_exclude_fields(self):
+        recipe = create_recipe(self.user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {'exclude': 'tags,link'})
+
+        expected = RecipeSerializer(recipe).data
+        del expected['tags'], expected['link']
+
+        self.assertEqual(res.data, [expected])
+        self.assertEqual(len(ctx), 2)
+
+    def test_detail_sparse_fieldset(self):
+        recipe = create_recipe(self.user)
+
+        res = self.client.get(detail_url(recipe.id), {'fields': 'description,ingredients'})
+
+        self.assertEqual(res.data, {'description': recipe.description, 'ingredients': []})
+
+    def test_sparse_fieldset_unknown_field(self):
+        res = self.client.get(RECIPE_URL, {'fields': 'id,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sparse_fieldset_without_fields(self):
+        create_recipe(self.user)
+
+        for params in ({'fields': ''}, {'fields': ' , '}, {'exclude': ','.join(RecipeSerializer.Meta.fields)}):
+            with self.subTest(params=params):
+                res = self.client.get(RECIPE_URL, params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(self.client.get(RECIPE_URL, {'exclude': ''}).data, self.client.get(RECIPE_URL).data)
+
+    def test_sparse_fieldset_ignored_on_write(self):
+        recipe = create_recipe(self.user)
+
+        res = self.client.patch(detail_url(recipe.id) + '?fields=id', {'title': 'new'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'new')
+
+    def test_list_paginated_with_cursor(self):
+        recipes = [create_recipe(self.user, title=f'r{i}') for i in range(5)]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data['results']], [recipes[4].id, recipes[3].id])
+
+        create_recipe(self.user, title='inserted while paging')
+        seen = [r['id'] for r in res.data['results']]
+        next_url = res.data['next']
+
+        while next_url:
+            res = self.client.get(next_url)
+            seen += [r['id'] for r in res.data['results']]
+            next_url = res.data['next']
+
+        self.assertEqual(seen, [r.id for r in reversed(recipes)])
+
+    def test_list_pagination_does_not_use_offset(self):
+        recipes = [create_recipe(self.user) for _ in range(3)]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 1})
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(res.data['results'][0]['id'], recipes[1].id)
+        self.assertNotIn('OFFSET', ctx.captured_queries[0]['sql'])
+
+    def test_list_invalid_cursor(self):
+        res = self.client.get(RECIPE_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_cursor_with_wrong_value_types(self):
+        create_recipe(self.user)
+
+        for position in ([{'a': 1}], ['abc'], [None], [[1]], [True]):
+            with self.subTest(position=position):
+                cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+                res = self.client.get(RECIPE_URL, {'cursor': cursor})
+
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_cursor_with_out_of_range_values(self):
+        create_recipe(self.user)
+
+        for position in ('[1e400]', '[-1e400]', '[99999999999999999999999]', '["99999999999999999999999"]'):
+            with self.subTest(position=position):
+                res = self.client.get(RECIPE_URL, {'cursor': base64.urlsafe_b64encode(position.encode()).decode()})
+
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_search_cursor_with_wrong_rank_type(self):
+        recipe = create_recipe(self.user, title='Thai curry')
+        cursor = base64.urlsafe_b64encode(json.dumps(['high', recipe.id]).encode()).decode()
+
+        res = self.client.get(RECIPE_URL, {'search': 'curry', 'cursor': cursor})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
 
 class ImageUploadTest(TestCase):
     def setUp(self):
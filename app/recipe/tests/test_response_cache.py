@@ -0,0 +1,141 @@
+"""
+Tests for the per-user response cache
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.cache import response_cache
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=(recipe_id,))
+
+
+def create_recipe(user, **params):
+    defaults = {'title': 'Some title', 'time_in_minutes': 5, 'price': Decimal('12.5')}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def token_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+
+    return client
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        self.client = token_client(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = create_recipe(self.user)
+        response_cache.reset_stats()
+
+    def test_second_read_is_served_from_cache(self):
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(RECIPE_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.content, res.content)
+        self.assertEqual(cached['Content-Type'], res['Content-Type'])
+        self.assertEqual(cached['ETag'], res['ETag'])
+        self.assertEqual(response_cache.stats()['hits'], 1)
+
+    def test_write_through_api_invalidates(self):
+        self.client.get(detail_url(self.recipe.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(detail_url(self.recipe.id), {'title': 'New title'})
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['title'], 'New title')
+        self.assertEqual(response_cache.stats()['invalidations'], 1)
+
+    def test_backend_evictions_are_counted(self):
+        self.client.get(RECIPE_URL)
+        self.client.get(TAGS_URL)
+
+        # The backend culls the recipe list entry.
+        response_cache.cache.delete(next(iter(response_cache.cache.get(response_cache._registry_key(self.user.pk)))))
+
+        self.assertEqual(self.client.get(RECIPE_URL)['X-Cache'], 'MISS')
+        self.assertEqual(response_cache.stats()['evictions'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_recipe(self.user)
+        self.client.get(TAGS_URL)
+
+        # Misses after an invalidation are not evictions.
+        self.assertEqual(response_cache.stats()['evictions'], 1)
+        self.assertEqual(response_cache.stats()['misses'], 4)
+
+    def test_m2m_change_invalidates(self):
+        self.client.get(RECIPE_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.tags.add(Tag.objects.create(user=self.user, name='tag1'))
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data[0]['tags'][0]['name'], 'tag1')
+
+    def test_id_list_params_are_normalised(self):
+        self.client.get(RECIPE_URL, {'tags': '2,1'})
+
+        res = self.client.get(RECIPE_URL, {'tags': '1,2,2'})
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_query_params_and_variants_are_separate(self):
+        self.client.get(RECIPE_URL)
+
+        self.assertEqual(self.client.get(RECIPE_URL, {'fields': 'id'})['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(TAGS_URL)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(TAGS_URL, {'assigned_only': 1})['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(TAGS_URL, {'assigned_only': 1})['X-Cache'], 'HIT')
+
+    def test_users_do_not_share_entries(self):
+        self.client.get(RECIPE_URL)
+
+        user2 = get_user_model().objects.create_user(email='user2@example.com', password='password123')
+        res = token_client(user2).get(RECIPE_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data, [])
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'CACHE_ALIAS': 'responses', 'MAX_ENTRY_SIZE': 10})
+    def test_oversized_responses_are_not_stored(self):
+        self.client.get(RECIPE_URL)
+
+        self.assertEqual(self.client.get(RECIPE_URL)['X-Cache'], 'MISS')
+        self.assertEqual(response_cache.stats()['oversized'], 2)
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'CACHE_ALIAS': 'responses', 'MAX_ENTRY_SIZE': 10})
+    def test_compressed_variants_count_toward_entry_size(self):
+        response_cache.set(self.user.pk, 'key', b'x' * 6, 'application/json')
+
+        response_cache.set_variant('key', 'gzip', b'y' * 4)
+        response_cache.set_variant('key', 'br', b'z')
+
+        self.assertEqual(response_cache.get(self.user.pk, 'key')['encoded'], {'gzip': b'y' * 4})
+        self.assertEqual(response_cache.stats()['oversized'], 1)
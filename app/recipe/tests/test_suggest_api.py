@@ -0,0 +1,94 @@
+"""
+Tests for tag and ingredient name suggestions
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.suggest import suggestion_index
+
+
+TAGS_SUGGEST_URL = reverse('recipe:tag-suggest')
+INGREDIENTS_SUGGEST_URL = reverse('recipe:ingredient-suggest')
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def create_recipe(user, tags=(), ingredients=()):
+    recipe = Recipe.objects.create(user=user, title='Some title', time_in_minutes=5, price='12.5')
+    recipe.tags.add(*tags)
+    recipe.ingredients.add(*ingredients)
+
+    return recipe
+
+
+class SuggestApiTest(TestCase):
+    def setUp(self):
+        suggestion_index.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+
+        self.tags = {name: Tag.objects.create(user=self.user, name=name) for name in ('Vegan', 'vegetarian', 'Veggie', 'Dessert')}
+        for i in range(3):
+            create_recipe(self.user, tags=[self.tags['vegetarian']] + ([self.tags['Veggie']] if i else []))
+
+        other = get_user_model().objects.create_user(email='other@example.com', password='password123')
+        Tag.objects.create(user=other, name='Venison')
+
+    def suggest(self, url=TAGS_SUGGEST_URL, **params):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+
+        return [(item['name'], item['usage']) for item in res.data]
+
+    def test_prefix_ranked_by_usage(self):
+        self.assertEqual(self.suggest(q='ve'), [('vegetarian', 3), ('Veggie', 2), ('Vegan', 0)])
+
+    def test_limit(self):
+        self.assertEqual(self.suggest(q='VEG', limit=1), [('vegetarian', 3)])
+
+    def test_no_match(self):
+        self.assertEqual(self.suggest(q='xyz'), [])
+
+    def test_prefix_required(self):
+        self.assertEqual(self.client.get(TAGS_SUGGEST_URL).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(TAGS_SUGGEST_URL, {'q': 've', 'limit': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ingredients(self):
+        flour = Ingredient.objects.create(user=self.user, name='flour')
+        create_recipe(self.user, ingredients=[flour])
+
+        self.assertEqual(self.suggest(INGREDIENTS_SUGGEST_URL, q='fl'), [('flour', 1)])
+
+    def test_cached_lookups_skip_the_database(self):
+        self.suggest(q='ve')
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.suggest(q='veg'), [('vegetarian', 3), ('Veggie', 2), ('Vegan', 0)])
+
+        self.assertEqual(len(ctx), 0)
+
+    def test_writes_refresh_suggestions(self):
+        self.suggest(q='ve')
+
+        payload = {'title': 'new', 'time_in_minutes': 5, 'price': '1.00', 'tags': [{'name': 'Velvet'}]}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(RECIPE_URL, payload, format='json')
+        self.user.refresh_from_db()
+
+        self.assertIn(('Velvet', 1), self.suggest(q='vel'))
+        self.assertEqual(self.suggest(q='vege'), [('vegetarian', 3)])
+
+    @override_settings(RECIPE_SUGGEST={'MAX_NAMES': 2})
+    def test_large_name_sets_query_the_database(self):
+        self.assertEqual(self.suggest(q='ve'), [('vegetarian', 3), ('Veggie', 2), ('Vegan', 0)])
+
+    @override_settings(RECIPE_SUGGEST={'CACHE': False})
+    def test_without_cache(self):
+        self.assertEqual(self.suggest(q='ve', limit=2), [('vegetarian', 3), ('Veggie', 2)])
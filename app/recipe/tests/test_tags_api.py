@@ -75,6 +75,16 @@ class PrivateTagsApiTest(TestCase):
 
         self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_duplicate_name(self):
+        create_tag(self.user, 'taken')
+        tag = create_tag(self.user, 'tag1')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'taken'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'tag1')
+
     def test_delete_tag(self):
         tag = create_tag(self.user, 'tag1')
 
@@ -113,3 +123,86 @@ class PrivateTagsApiTest(TestCase):
 
         data = TagSerializer([tag1], many=True).data
         self.assertEqual(res.data, data)
+
+    def test_tags_paginated_by_name(self):
+        tags = [create_tag(self.user, 'beta'), create_tag(self.user, 'delta'), create_tag(self.user, 'alpha'), create_tag(self.user, 'zulu')]
+
+        seen = []
+        res = self.client.get(TAGS_URL, {'page_size': 1})
+
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen += [t['id'] for t in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(seen, [tags[3].id, tags[1].id, tags[0].id, tags[2].id])
+
+    def test_tags_sparse_fieldset(self):
+        tag = create_tag(self.user, 'tag1')
+
+        res = self.client.get(TAGS_URL, {'fields': 'id'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': tag.id}])
+
+    def test_tags_sparse_fieldset_usage_needs_counts(self):
+        tag = create_tag(self.user, 'tag1')
+
+        res = self.client.get(TAGS_URL, {'fields': 'usage'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(TAGS_URL, {'fields': 'id,usage', 'with_counts': 1})
+
+        self.assertEqual(res.data, [{'id': tag.id, 'usage': 0}])
+
+    def test_tags_with_counts(self):
+        tag1 = create_tag(self.user, 'tag1')
+        tag2 = create_tag(self.user, 'tag2')
+        create_tag(self.user, 'tag3')
+        for i in range(3):
+            recipe = Recipe.objects.create(title=f'recipe {i}', price='5.5', time_in_minutes=30, user=self.user)
+            recipe.tags.add(tag1, *([tag2] if i else []))
+
+        res = self.client.get(TAGS_URL, {'with_counts': 1, 'ordering': '-usage'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([(t['name'], t['usage']) for t in res.data], [('tag1', 3), ('tag2', 2), ('tag3', 0)])
+        self.assertNotIn('usage', self.client.get(TAGS_URL).data[0])
+
+    def test_tags_paginated_by_usage(self):
+        tags = [create_tag(self.user, f'tag{i}') for i in range(4)]
+        for i, tag in enumerate(tags):
+            for _ in range(i % 2):
+                Recipe.objects.create(title='asd', price='5.5', time_in_minutes=30, user=self.user).tags.add(tag)
+
+        seen = []
+        res = self.client.get(TAGS_URL, {'ordering': '-usage', 'page_size': 1})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen += [t['id'] for t in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(seen, [tags[3].id, tags[1].id, tags[2].id, tags[0].id])
+
+    def test_tags_invalid_ordering(self):
+        res = self.client.get(TAGS_URL, {'ordering': 'user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tags_invalid_flags(self):
+        for params in ({'with_counts': 'yes'}, {'assigned_only': 'x'}, {'assigned_only': ''}):
+            with self.subTest(params=params):
+                res = self.client.get(TAGS_URL, params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(next(iter(params)), res.data)
+
+    def test_tags_invalid_flag_not_answered_from_cache(self):
+        self.client.get(TAGS_URL, {'with_counts': 1})
+
+        self.assertEqual(self.client.get(TAGS_URL, {'with_counts': 'yes'}).status_code, status.HTTP_400_BAD_REQUEST)
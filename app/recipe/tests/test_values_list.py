@@ -0,0 +1,125 @@
+"""
+Differential tests for the values() based list rendering
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import Prefetch
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.serializers import RecipeDetailSerializer, ValuesListSerializer
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class ValuesListDifferentialTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+
+        tags = [Tag.objects.create(user=self.user, name=name) for name in ('zulu', 'Ünïcode "quoted"', 'alpha', 'vegan')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name) for name in ('salt', 'pepper', 'flour')]
+
+        for i, price in enumerate(('0.5', '12', '999.99', '1.005', '100.1')):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i} with breakfast' if i % 2 else f'Recipe {i}',
+                time_in_minutes=i * 7,
+                price=Decimal(price),
+                link='' if i % 2 else f'http://example.com/{i}',
+                description='Some description',
+                image=f'uploads/recipe/{i}.jpg' if i == 3 else None,
+            )
+            # Link in reverse primary key order so only an explicit ordering makes nested lists stable.
+            recipe.tags.add(*reversed(tags[i % 3:]))
+            recipe.ingredients.add(*reversed(ingredients[:i % 4]))
+
+    def get_both(self, url, params=None):
+        """Return the response bodies of the values() path and of the regular serializer path."""
+        caches['responses'].clear()
+        fast = self.client.get(url, params)
+
+        caches['responses'].clear()
+        with patch.object(ValuesListSerializer, 'values_queryset', return_value=None):
+            regular = self.client.get(url, params)
+
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(regular.status_code, 200)
+
+        return fast.content, regular.content
+
+    def assertSameOutput(self, url, params=None):
+        fast, regular = self.get_both(url, params)
+        self.assertEqual(fast, regular)
+
+    def test_recipe_list(self):
+        self.assertSameOutput(RECIPE_URL)
+
+    def test_list_does_not_build_instances(self):
+        for model, url in ((Recipe, RECIPE_URL), (Tag, TAGS_URL), (Ingredient, INGREDIENTS_URL)):
+            with self.subTest(url=url), patch.object(model, 'from_db', side_effect=AssertionError('model instance built')):
+                caches['responses'].clear()
+                res = self.client.get(url)
+
+                self.assertEqual(res.status_code, 200)
+
+    def test_recipe_list_variants(self):
+        for params in (
+            {'search': 'breakfast'},
+            {'fields': 'id,price,tags'},
+            {'exclude': 'tags,ingredients'},
+            {'tags': ','.join(str(pk) for pk in Tag.objects.values_list('id', flat=True)[:2])},
+            {'page_size': 2},
+        ):
+            with self.subTest(params=params):
+                self.assertSameOutput(RECIPE_URL, params)
+
+    def test_recipe_list_next_page(self):
+        first = self.client.get(RECIPE_URL, {'page_size': 2})
+
+        self.assertSameOutput(first.data['next'])
+
+    def test_tag_and_ingredient_lists(self):
+        for url in (TAGS_URL, INGREDIENTS_URL):
+            for params in (None, {'assigned_only': 1}, {'fields': 'name'}, {'page_size': 2}, {'with_counts': 1, 'ordering': '-usage'}):
+                with self.subTest(url=url, params=params):
+                    self.assertSameOutput(url, params)
+
+    def test_detail_serializer_with_image_and_description(self):
+        request = Request(APIRequestFactory().get('/'))
+        queryset = Recipe.objects.order_by('-id')
+        instances = queryset.prefetch_related(Prefetch('tags', Tag.objects.order_by('pk')), Prefetch('ingredients', Ingredient.objects.order_by('pk')))
+
+        serializer = RecipeDetailSerializer(queryset, many=True, context={'request': request})
+        fast = serializer.to_representation(serializer.values_queryset(queryset))
+        regular = RecipeDetailSerializer(instances, many=True, context={'request': request}).data
+
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(regular))
+        self.assertTrue(any(item['image'] for item in fast))
+
+    def test_unsupported_fields_fall_back(self):
+        class TitleSerializer(serializers.ModelSerializer):
+            upper = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Recipe
+                fields = ('id', 'upper')
+                list_serializer_class = ValuesListSerializer
+
+            def get_upper(self, obj):
+                return obj.title.upper()
+
+        self.assertIsNone(TitleSerializer(Recipe.objects.all(), many=True).values_queryset(Recipe.objects.all()))
@@ -1,13 +1,37 @@
 from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter, OpenApiTypes
 
+from django.db.models import Count, Exists, OuterRef
+from django.http import StreamingHttpResponse
+
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from core.authentication import CachedTokenAuthentication, SignedTokenAuthentication
 from core.models import Recipe, Tag, Ingredient
-from .serializers import RecipeSerializer, RecipeDetailSerializer, TagSerializer, IngredientSerializer, RecipeImageSerializer
+from core.search import search_recipes
+from .bulk import create_recipes, delete_recipes, merge_names, update_recipes
+from .cache import CachedResponseMixin
+from .export import csv_lines, iter_recipes, ndjson_lines
+from .mixins import SPARSE_FIELDSET_PARAMETERS, ConditionalGetMixin, SparseFieldsetMixin, ValuesListMixin
+from .pagination import KeysetPagination
+from .parsers import NDJSONParser
+from .renderers import CSVRenderer, NDJSONRenderer
+from .serializers import (
+    MAX_ID, RecipeSerializer, RecipeDetailSerializer, TagSerializer, IngredientSerializer, RecipeImageSerializer, SuggestionSerializer, MergeSerializer,
+)
+from .suggest import suggest_options, suggestion_index
+
+
+ATTR_ORDERINGS = {
+    '-name': ('-name', '-id'),
+    'name': ('name', 'id'),
+    '-usage': ('-usage', '-id'),
+    'usage': ('usage', 'id'),
+}
 
 
 @extend_schema_view(
@@ -23,30 +47,72 @@ from .serializers import RecipeSerializer, RecipeDetailSerializer, TagSerializer
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredient ids to filter (ingredients=1,3,4)'
             ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR,
+                enum=('any', 'all'),
+                description='Return recipes linked to any (default) or to all of the given tags/ingredients',
+            ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description='Full-text search over title, description, tag and ingredient names, best matches first',
+            ),
+            *SPARSE_FIELDSET_PARAMETERS,
         ]
-    )
+    ),
+    retrieve=extend_schema(parameters=SPARSE_FIELDSET_PARAMETERS),
+    export=extend_schema(
+        description='Stream every recipe matching the list filters as NDJSON (default) or CSV (`?format=csv` or `Accept: text/csv`).',
+        responses={(200, 'application/x-ndjson'): OpenApiTypes.STR, (200, 'text/csv'): OpenApiTypes.STR},
+    ),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedResponseMixin, ConditionalGetMixin, SparseFieldsetMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = RecipeDetailSerializer
-    queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    queryset = Recipe.objects.defer('search_vector')
+    authentication_classes = (CachedTokenAuthentication, SignedTokenAuthentication)
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    sparse_prefetch = ('tags', 'ingredients')
+    export_chunk_size = 2000
 
     def _params_to_ints(self, qs):
         return [int(id) for id in qs.split(',')]
 
+    def _filter_by_links(self, queryset, through, column, ids, match):
+        """Semi-join on the M2M through table so matching recipes never need DISTINCT."""
+        links = through.objects.filter(**{f'{column}__in': ids})
+
+        if match == 'all':
+            matched = links.values('recipe_id').annotate(matched=Count(column)).filter(matched=len(ids))
+            return queryset.filter(id__in=matched.values('recipe_id'))
+
+        return queryset.filter(Exists(links.filter(recipe_id=OuterRef('pk'))))
+
     def get_queryset(self):
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        match = self.request.query_params.get('match', 'any')
+        search = self.request.query_params.get('search')
         queryset = self.queryset
 
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': 'Must be one of "any" or "all".'})
+
         if tags:
-            queryset = queryset.filter(tags__id__in=self._params_to_ints(tags))
+            queryset = self._filter_by_links(queryset, Recipe.tags.through, 'tag_id', set(self._params_to_ints(tags)), match)
 
         if ingredients:
-            queryset = queryset.filter(ingredients__id__in=self._params_to_ints(ingredients))
+            queryset = self._filter_by_links(queryset, Recipe.ingredients.through, 'ingredient_id', set(self._params_to_ints(ingredients)), match)
 
-        return queryset.filter(user=self.request.user).order_by('-id').distinct()
+        queryset = queryset.filter(user=self.request.user)
+
+        if search and self.action in ('list', 'export'):
+            queryset = search_recipes(queryset, search).order_by('-rank', '-id')
+        else:
+            queryset = queryset.order_by('-id')
+
+        return self.apply_sparse_fieldset(queryset)
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -70,6 +136,137 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['GET'], detail=False, renderer_classes=(NDJSONRenderer, CSVRenderer))
+    def export(self, request):
+        rows = iter_recipes(self.get_queryset(), self.export_chunk_size, request.build_absolute_uri)
+        renderer = request.accepted_renderer
+
+        lines = csv_lines(rows) if renderer.format == 'csv' else ndjson_lines(rows)
+        response = StreamingHttpResponse((line.encode(renderer.charset) for line in lines), content_type=f'{renderer.media_type}; charset={renderer.charset}')
+        response['Content-Disposition'] = f'attachment; filename="recipes.{renderer.format}"'
+
+        return response
+
+    @extend_schema(
+        description='Create many recipes in one transaction from a JSON array or NDJSON. Invalid items are reported by index and skipped.',
+        request=RecipeDetailSerializer(many=True),
+        responses={201: OpenApiTypes.OBJECT, 207: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+    )
+    @action(methods=['POST'], detail=False, parser_classes=(*api_settings.DEFAULT_PARSER_CLASSES, NDJSONParser))
+    def bulk(self, request):
+        if not isinstance(request.data, list):
+            return Response({'detail': 'Expected a list of recipes.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        valid, indexes, errors = [], [], []
+        for index, item in enumerate(request.data):
+            serializer = self.get_serializer(data=item)
+
+            if serializer.is_valid():
+                valid.append(serializer.validated_data)
+                indexes.append(index)
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        recipes = create_recipes(request.user, valid)
+        created = [{'index': index, 'id': recipe.pk} for index, recipe in zip(indexes, recipes)]
+
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif not created:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+
+        return Response({'created': created, 'errors': errors}, status=response_status)
+
+    def _bulk_ids(self, values):
+        if not isinstance(values, list):
+            raise ValidationError({'ids': 'Must be a list of recipe ids.'})
+
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in values))
+        except (TypeError, ValueError):
+            raise ValidationError({'ids': 'Must be a list of recipe ids.'})
+
+        if not all(0 < pk <= MAX_ID for pk in ids):
+            raise ValidationError({'ids': 'Must be a list of recipe ids.'})
+
+        return ids
+
+    def _bulk_response(self, results):
+        failed = sum(result['status'] >= 400 for result in results)
+
+        if not failed:
+            response_status = status.HTTP_200_OK
+        elif failed == len(results):
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+
+        return Response({'results': results}, status=response_status)
+
+    @extend_schema(
+        description=(
+            'Partially update many recipes at once. Send `{"ids": [...], <fields>}` to apply the same change to every id, '
+            'or a list of `{"id": ..., <fields>}` objects for per-recipe changes. Results are reported per id.'
+        ),
+        request=OpenApiTypes.OBJECT,
+        responses={200: OpenApiTypes.OBJECT, 207: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+    )
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        if isinstance(request.data, list):
+            if not all(isinstance(item, dict) for item in request.data):
+                raise ValidationError({'detail': 'Expected a list of objects with an "id".'})
+            items = [({key: value for key, value in item.items() if key != 'id'}, self._bulk_ids([item.get('id')])) for item in request.data]
+        elif isinstance(request.data, dict) and 'ids' in request.data:
+            data = {key: value for key, value in request.data.items() if key != 'ids'}
+            items = [(data, self._bulk_ids(request.data['ids']))]
+        else:
+            raise ValidationError({'detail': 'Expected {"ids": [...], <fields>} or a list of objects with an "id".'})
+
+        owned = set(Recipe.objects.filter(user=request.user, pk__in=[pk for _data, ids in items for pk in ids]).values_list('id', flat=True))
+        changes, results = [], []
+
+        for data, ids in items:
+            serializer = self.get_serializer(data=data, partial=True)
+            valid = serializer.is_valid()
+            found = [pk for pk in ids if pk in owned]
+
+            for pk in ids:
+                if pk not in owned:
+                    results.append({'id': pk, 'status': status.HTTP_404_NOT_FOUND})
+                elif not valid:
+                    results.append({'id': pk, 'status': status.HTTP_400_BAD_REQUEST, 'errors': serializer.errors})
+                else:
+                    results.append({'id': pk, 'status': status.HTTP_200_OK})
+
+            if valid and found:
+                changes.append((found, serializer.validated_data))
+
+        update_recipes(request.user, changes)
+
+        return self._bulk_response(results)
+
+    @extend_schema(
+        description='Delete many recipes at once from `{"ids": [...]}`. Results are reported per id.',
+        request=OpenApiTypes.OBJECT,
+        responses={200: OpenApiTypes.OBJECT, 207: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+    )
+    @bulk.mapping.delete
+    def bulk_destroy(self, request):
+        if not isinstance(request.data, dict) or 'ids' not in request.data:
+            raise ValidationError({'ids': 'This field is required.'})
+
+        ids = self._bulk_ids(request.data['ids'])
+        owned = set(Recipe.objects.filter(user=request.user, pk__in=ids).values_list('id', flat=True))
+        delete_recipes(request.user, owned)
+
+        return self._bulk_response([
+            {'id': pk, 'status': status.HTTP_204_NO_CONTENT if pk in owned else status.HTTP_404_NOT_FOUND}
+            for pk in ids
+        ])
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -79,27 +276,115 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 OpenApiTypes.INT,
                 enum=(0, 1),
                 description='Filter by items assigned to recipies',
-            )
+            ),
+            OpenApiParameter(
+                'with_counts',
+                OpenApiTypes.INT,
+                enum=(0, 1),
+                description='Include `usage`, the number of recipes each item is assigned to',
+            ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR,
+                enum=tuple(ATTR_ORDERINGS),
+                description='Sort by name (default `-name`) or by number of recipes using each item',
+            ),
+            *SPARSE_FIELDSET_PARAMETERS,
         ]
-    )
+    ),
+    suggest=extend_schema(
+        description='Names starting with `q` (case-insensitive), most used first.',
+        parameters=[
+            OpenApiParameter('q', OpenApiTypes.STR, required=True, description='Prefix to complete'),
+            OpenApiParameter('limit', OpenApiTypes.INT, description='Number of suggestions (default 10, max 50)'),
+        ],
+        responses=SuggestionSerializer(many=True),
+    ),
+    merge=extend_schema(
+        description='Move the recipe links of `sources` to `target`, delete `sources` and optionally rename `target` to `name`.',
+        request=MergeSerializer,
+    ),
 )
-class BaseRecipeAttrViewSet(mixins.ListModelMixin, mixins.UpdateModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
-    authentication_classes = (TokenAuthentication,)
+class BaseRecipeAttrViewSet(
+    CachedResponseMixin, ConditionalGetMixin, SparseFieldsetMixin, ValuesListMixin,
+    mixins.ListModelMixin, mixins.UpdateModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet
+):
+    authentication_classes = (CachedTokenAuthentication, SignedTokenAuthentication)
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    conditional_actions = ('list', 'retrieve', 'suggest')
+    recipe_relation = None
+
+    def _flag(self, name):
+        value = self.request.query_params.get(name, '0')
+
+        if value not in ('0', '1'):
+            raise ValidationError({name: 'Must be 0 or 1.'})
+
+        return value == '1'
+
+    def _ordering(self):
+        ordering = self.request.query_params.get('ordering', '-name')
+
+        if ordering not in ATTR_ORDERINGS:
+            raise ValidationError({'ordering': f'Must be one of {", ".join(ATTR_ORDERINGS)}.'})
+
+        return ATTR_ORDERINGS[ordering]
+
+    def with_counts(self):
+        return self.action == 'list' and self._flag('with_counts')
 
     def get_queryset(self):
-        queryset = self.queryset
-        if bool(int(self.request.query_params.get('assigned_only', 0))):
-            queryset = queryset.filter(recipe__isnull=False)
+        through = getattr(Recipe, self.recipe_relation).through
+        column = getattr(Recipe, self.recipe_relation).field.m2m_reverse_name()
+        ordering = self._ordering()
+        queryset = self.queryset.filter(user=self.request.user)
+
+        if self._flag('assigned_only'):
+            queryset = queryset.filter(Exists(through.objects.filter(**{column: OuterRef('pk')})))
+
+        if self.with_counts() or 'usage' in ordering[0]:
+            # One GROUP BY over the through table; the join to the recipes themselves is trimmed.
+            queryset = queryset.annotate(usage=Count('recipe'))
+
+        return self.apply_sparse_fieldset(queryset.order_by(*ordering))
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'with_counts': self.with_counts()}
+
+    @action(methods=['GET'], detail=False, pagination_class=None)
+    def suggest(self, request):
+        prefix = request.query_params.get('q', '').strip()
+        if not prefix:
+            raise ValidationError({'q': 'This field is required.'})
+
+        options = suggest_options()
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', options['LIMIT'])), options['MAX_LIMIT']))
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+
+        return Response(suggestion_index.suggest(request.user, self.queryset.filter(user=request.user), prefix, limit))
+
+    @action(methods=['POST'], detail=False)
+    def merge(self, request):
+        model = self.queryset.model
+        serializer = MergeSerializer(data=request.data, context={**self.get_serializer_context(), 'model': model})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        merge_names(request.user, model, self.recipe_relation, data['target'], data['sources'], data.get('name'))
 
-        return queryset.filter(user=self.request.user).order_by('-name').distinct()
+        return Response(self.get_serializer(model.objects.get(pk=data['target'])).data)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
+    recipe_relation = 'tags'
 
 
 class IngredientView(BaseRecipeAttrViewSet):
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
+    recipe_relation = 'ingredients'
@@ -1,6 +1,11 @@
 from django.contrib.auth import get_user_model, authenticate
 from rest_framework import serializers
 from django.utils.translation import gettext as _
+from django.db.models import F
+from django.utils import timezone
+
+from core.hashing import password_hashing
+from core.tokens import InvalidToken, refresh_access_token, token_versions
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -10,18 +15,38 @@ class UserSerializer(serializers.ModelSerializer):
         extra_kwargs = {'password': {'write_only': True, 'min_length': 5}}
 
     def create(self, validated_data):
-        return get_user_model().objects.create_user(**validated_data)
+        with password_hashing.slot():
+            return get_user_model().objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
+        """Write the changed columns with a single UPDATE, or nothing when no value changed."""
         password = validated_data.pop('password', None)
+        # Users authenticated by a signed token arrive with only their id loaded.
+        deferred = instance.get_deferred_fields().intersection(validated_data)
+        if deferred:
+            instance.refresh_from_db(fields=deferred)
+
+        changed = [name for name, value in validated_data.items() if getattr(instance, name) != value]
+
+        for name in changed:
+            setattr(instance, name, validated_data[name])
+
+        if password:
+            with password_hashing.slot():
+                instance.set_password(password)
+            # Revoke the signed tokens in the same statement that stores the new password.
+            instance.token_version = F('token_version') + 1
+            instance.token_changed_at = timezone.now()
+            changed += ['password', 'token_version', 'token_changed_at']
 
-        user = super().update(instance, validated_data)
+        if changed:
+            instance.save(update_fields=changed)
 
         if password:
-            user.set_password(password)
-            user.save()
+            instance.refresh_from_db(fields=['token_version'])
+            token_versions.set(instance.pk, instance.token_version)
 
-        return user
+        return instance
 
 
 class AuthTokenSerializer(serializers.Serializer):
@@ -31,7 +56,9 @@ class AuthTokenSerializer(serializers.Serializer):
     def validate(self, attrs):
         email = attrs.get('email')
         password = attrs.get('password')
-        user = authenticate(request=self.context.get('request'), username=email, password=password)
+        # Also covers the rehash of outdated hashes that Django does on a successful check.
+        with password_hashing.slot():
+            user = authenticate(request=self.context.get('request'), username=email, password=password)
 
         if not user:
             raise serializers.ValidationError(_('Unable to authenticate user.'), code='authorization')
@@ -39,3 +66,14 @@ class AuthTokenSerializer(serializers.Serializer):
         attrs['user'] = user
 
         return attrs
+
+
+class SignedTokenSerializer(serializers.Serializer):
+    access = serializers.CharField(read_only=True)
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            return refresh_access_token(attrs['refresh'])
+        except InvalidToken:
+            raise serializers.ValidationError(_('Invalid or expired refresh token.'), code='authorization')
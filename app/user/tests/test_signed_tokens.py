@@ -0,0 +1,150 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.authentication import SignedTokenAuthentication
+from core.tokens import REVOKED, token_versions
+
+
+SIGNED_TOKEN_URL = reverse('user:token-signed')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+ME_URL = reverse('user:me')
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(SIGNED_TOKENS={'BACKGROUND_REFRESH': False})
+class SignedTokenApiTests(TestCase):
+    def setUp(self):
+        token_versions.clear()
+        self.user = get_user_model().objects.create_user(email='user@example.com', password='password123', name='name')
+        self.client = APIClient()
+
+    def issue(self):
+        res = self.client.post(SIGNED_TOKEN_URL, {'email': 'user@example.com', 'password': 'password123'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res.data
+
+    def bearer(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        return client
+
+    def test_issue_requires_valid_credentials(self):
+        res = self.client.post(SIGNED_TOKEN_URL, {'email': 'user@example.com', 'password': 'wrong'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_access_token_authenticates_without_queries(self):
+        access = self.issue()['access']
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        SignedTokenAuthentication().authenticate(request)
+
+        with CaptureQueriesContext(connection) as ctx:
+            user, _token = SignedTokenAuthentication().authenticate(request)
+
+        self.assertEqual(len(ctx), 0)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(self.bearer(access).get(ME_URL).data['email'], 'user@example.com')
+
+    def test_unchanged_update_skips_the_write(self):
+        client = self.bearer(self.issue()['access'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = client.patch(ME_URL, {'name': 'name', 'email': 'user@example.com'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'email': 'user@example.com', 'name': 'name'})
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')])
+
+    def test_db_tokens_keep_working(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+        self.assertEqual(client.get(RECIPE_URL).status_code, status.HTTP_200_OK)
+
+    def test_invalid_and_expired_tokens(self):
+        tokens = self.issue()
+
+        self.assertEqual(self.bearer('garbage').get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+        # A refresh token is signed with another salt and cannot be used as an access token.
+        self.assertEqual(self.bearer(tokens['refresh']).get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with patch('django.core.signing.time.time', return_value=10 ** 10):
+            self.assertEqual(self.bearer(tokens['access']).get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh(self):
+        tokens = self.issue()
+
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.bearer(res.data['access']).get(ME_URL).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.post(REFRESH_URL, {'refresh': tokens['access']}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_revoke(self):
+        tokens = self.issue()
+        client = self.bearer(tokens['access'])
+
+        self.assertEqual(client.post(REVOKE_URL).status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.post(REFRESH_URL, {'refresh': tokens['refresh']}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.bearer(self.issue()['access']).get(ME_URL).status_code, status.HTTP_200_OK)
+
+    def test_password_change_revokes(self):
+        client = self.bearer(self.issue()['access'])
+
+        client.patch(ME_URL, {'password': 'newpassword123'})
+
+        self.assertEqual(client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_from_other_processes_is_picked_up(self):
+        client = self.bearer(self.issue()['access'])
+        client.get(ME_URL)
+
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False, token_changed_at=timezone.now())
+
+        with override_settings(SIGNED_TOKENS={'BACKGROUND_REFRESH': False, 'REVOCATION_REFRESH': 0}):
+            self.assertEqual(client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_only_reads_recent_changes(self):
+        users = get_user_model().objects
+        inactive = users.create_user(email='inactive@example.com', password='password123', is_active=False)
+        token_versions.load()
+
+        users.filter(pk=self.user.pk).update(token_version=2, token_changed_at=timezone.now())
+        # An old change the previous load has already seen.
+        users.filter(pk=inactive.pk).update(is_active=True, token_changed_at=timezone.now() - timedelta(hours=1))
+
+        with CaptureQueriesContext(connection) as ctx:
+            token_versions.load()
+
+        self.assertIn('"token_changed_at" >=', ctx.captured_queries[0]['sql'])
+        self.assertEqual(token_versions.get(self.user.pk), 2)
+        self.assertEqual(token_versions.get(inactive.pk), REVOKED)
+
+    def test_activity_changes_are_stamped(self):
+        self.user.is_active = False
+        self.user.save()
+        self.user.refresh_from_db()
+        deactivated_at = self.user.token_changed_at
+
+        self.user.is_active = True
+        self.user.save(update_fields=['is_active'])
+        self.user.refresh_from_db()
+
+        self.assertIsNotNone(deactivated_at)
+        self.assertGreater(self.user.token_changed_at, deactivated_at)
@@ -1,4 +1,8 @@
+import re
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
@@ -113,3 +117,27 @@ class PrivateUserApi(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def capture_updates(self, payload):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(ME_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        # The columns each UPDATE of the user row sets.
+        return [
+            re.findall(r'"(\w+)" = ', q['sql'].split(' WHERE ')[0])
+            for q in ctx.captured_queries if q['sql'].startswith('UPDATE "core_user" SET ')
+        ]
+
+    def test_update_writes_only_changed_columns(self):
+        self.assertEqual(self.capture_updates({'name': 'New Name', 'email': self.user.email}), [['name']])
+
+    def test_update_with_password_is_one_statement(self):
+        updates = self.capture_updates({'name': 'New Name', 'password': 'newpassword'})
+
+        self.assertEqual([sorted(columns) for columns in updates], [['name', 'password', 'token_changed_at', 'token_version']])
+
+    def test_unchanged_update_skips_the_write(self):
+        self.assertEqual(self.capture_updates({'name': self.user.name, 'email': self.user.email}), [])
+        self.assertEqual(self.capture_updates({}), [])
@@ -1,11 +1,14 @@
 from django.urls import path
 
-from .views import CreateUserView, CreateTokenView, UpdateUserView
+from .views import CreateUserView, CreateTokenView, CreateSignedTokenView, RefreshSignedTokenView, RevokeSignedTokensView, UpdateUserView
 
 app_name = 'user'
 
 urlpatterns = [
     path('create/', CreateUserView.as_view(), name='create'),
     path('token/', CreateTokenView.as_view(), name='token'),
+    path('token/signed/', CreateSignedTokenView.as_view(), name='token-signed'),
+    path('token/refresh/', RefreshSignedTokenView.as_view(), name='token-refresh'),
+    path('token/revoke/', RevokeSignedTokensView.as_view(), name='token-revoke'),
     path('me/', UpdateUserView.as_view(), name='me'),
 ]
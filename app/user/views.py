@@ -1,13 +1,55 @@
-from rest_framework import generics, authentication, permissions
+from drf_spectacular.utils import extend_schema
+
+from rest_framework import generics, permissions, status
 from rest_framework. authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
-from user.serializers import UserSerializer, AuthTokenSerializer
+from core.authentication import CachedTokenAuthentication, SignedTokenAuthentication
+from core.tokens import issue_tokens, revoke_tokens
+from user.serializers import UserSerializer, AuthTokenSerializer, SignedTokenSerializer
 
 
 class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+
+
+class CreateSignedTokenView(CreateTokenView):
+    """Issue a short-lived signed access token and a refresh token, used as `Authorization: Bearer <access>`."""
+
+    @extend_schema(responses=SignedTokenSerializer)
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(issue_tokens(serializer.validated_data['user']))
+
+
+class RefreshSignedTokenView(generics.GenericAPIView):
+    """Exchange a refresh token for a new pair of signed tokens."""
+    serializer_class = SignedTokenSerializer
+    permission_classes = ()
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(serializer.validated_data)
+
+
+class RevokeSignedTokensView(APIView):
+    """Invalidate every signed token issued to the user so far."""
+    authentication_classes = (CachedTokenAuthentication, SignedTokenAuthentication)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @extend_schema(request=None, responses={204: None})
+    def post(self, request, *args, **kwargs):
+        revoke_tokens(request.user.pk)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -16,7 +58,7 @@ class CreateUserView(generics.CreateAPIView):
 
 class UpdateUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication, SignedTokenAuthentication)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):